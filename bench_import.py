@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how long `import blanket` takes in a fresh interpreter, so startup
+cost can be tracked as a regression metric:
+
+    python bench_import.py [--runs N] [--max-us MICROSECONDS]
+
+Where the interpreter supports `-X importtime` (3.7+) the cumulative figure
+it reports for `blanket` is used, along with the modules it pulled in;
+otherwise it falls back to the wall clock time of `import blanket` less that
+of an empty interpreter. Exits non-zero if the median is over `--max-us`.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import argparse
+import os
+import subprocess
+import sys
+import timeit
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+
+def importtime():
+    """
+    Returns the cumulative microseconds for `blanket`, and the names of the
+    modules first imported while importing it.
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-X', 'importtime', '-c', 'import blanket'],
+        stderr=subprocess.STDOUT, cwd=HERE).decode('utf-8')
+    seen = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not cumulative.strip().isdigit():
+            continue
+        # nesting is shown by indentation, and children come first.
+        depth = len(name) - len(name.lstrip())
+        if name.strip() == 'blanket':
+            modules = []
+            for child_depth, child in reversed(seen):
+                if child_depth <= depth:
+                    break
+                if child_depth == depth + 2:
+                    modules.append(child)
+            return int(cumulative), sorted(modules)
+        seen.append((depth, name.strip()))
+    raise RuntimeError("`blanket` did not appear in the -X importtime "
+                       "output:\n{0}".format(output))
+
+
+def wallclock():
+    def run(statement):
+        start = timeit.default_timer()
+        subprocess.check_call([sys.executable, '-c', statement], cwd=HERE)
+        return timeit.default_timer() - start
+    baseline = run('pass')
+    return int((run('import blanket') - baseline) * 1000000), []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=11)
+    parser.add_argument('--max-us', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    measure = importtime if sys.version_info >= (3, 7) else wallclock
+    results = [measure() for _ in range(args.runs)]
+    timings = sorted(timing for timing, _ in results)
+    median = timings[len(timings) // 2]
+    print('import blanket: median {0}us, min {1}us, max {2}us over {3} '
+          'runs ({4})'.format(median, timings[0], timings[-1], args.runs,
+                              measure.__name__))
+    modules = results[-1][1]
+    if modules:
+        print('modules first imported by blanket: {0}'.format(
+            ', '.join(modules)))
+    if args.max_us is not None and median > args.max_us:
+        print('FAIL: over the {0}us budget'.format(args.max_us))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':  # nocover
+    sys.exit(main())
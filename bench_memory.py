@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Measures how much memory a route table takes, per route, for each router:
+
+    python bench_memory.py [--routes N]
+
+Routes are tenant-per-route, ie: `/tenant-123/items/{item!d}/`, with a
+handful of static and differently shaped routes per tenant mixed in. Uses
+`tracemalloc`, so needs Python 3.4+.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import argparse
+import gc
+import sys
+import timeit
+
+from blanket import CompactRouter
+from blanket import JSON
+from blanket import Router
+
+def item(request, item):
+    return {'item': item}
+
+
+def user(request, user):
+    return {'user': user}
+
+
+def about(request):
+    return {}
+
+
+SHAPES = (
+    ('/tenant-{tenant}/items/{{item!d}}/', item),
+    ('/tenant-{tenant}/items/{{item!d}}/edit/', item),
+    ('/tenant-{tenant}/users/{{user!slug}}/', user),
+    ('/tenant-{tenant}/about/', about),
+)
+
+
+def routes(count):
+    for index in range(count):
+        path, handler = SHAPES[index % len(SHAPES)]
+        yield path.format(tenant=index // len(SHAPES)), handler
+
+
+def measure(router_class, count):
+    import tracemalloc
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    router = router_class()
+    for path, handler in routes(count):
+        router.add(thing=path, handler=handler, outputs=(JSON,))
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return router, used
+
+
+def lookup(router, count):
+    last = count // len(SHAPES) - 1
+    path = '/tenant-{0}/items/1/'.format(last)
+    return min(timeit.repeat(lambda: next(iter(router.matches(path=path))),
+                             number=20, repeat=3)) / 20
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--routes', type=int, default=20000)
+    args = parser.parse_args(argv)
+    try:
+        import tracemalloc  # noqa
+    except ImportError:
+        print('tracemalloc is unavailable on this interpreter')
+        return 1
+
+    for router_class in (Router, CompactRouter):
+        router, used = measure(router_class=router_class, count=args.routes)
+        print('{name}: {routes} routes, {total:.1f}MiB, {per:.0f} bytes per '
+              'route, last route found in {lookup:.1f}us'.format(
+            name=router_class.__name__, routes=len(router),
+            total=used / 1048576, per=used / args.routes,
+            lookup=lookup(router=router, count=args.routes) * 1000000))
+        del router
+    return 0
+
+
+if __name__ == '__main__':  # nocover
+    sys.exit(main())
@@ -3,15 +3,20 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 from __future__ import division
+# Only what's needed to define routes is imported up front; anything used
+# solely while serving (webob, json, inspect, hashlib...) or by optional
+# outputs (chevron, brotli) is imported where it's used, so that importing
+# blanket stays cheap. See bench_import.py
 from collections import namedtuple
+from collections import OrderedDict
 from functools import partial
-from inspect import isclass, getargspec
-import json
 import logging
+import os
 import re
-from webob import Request
-from webob import Response
-from webob.compat import iteritems_
+import sys
+import threading
+import time
+import types
 
 __all__ = (
     # errors
@@ -21,14 +26,40 @@ __all__ = (
     'NoRouteHandler',
     'NoErrorHandler',
     'DuplicateRoute',
+    'RequestTooLarge',
+    'DeadlineExceeded',
     # userland stuff
     'keepcalling',
     'ManyHandler',
     'Httpish',
+    'RequestScope',
     'Blanket',
 )
 logger = logging.getLogger(__name__)
 
+try:
+    text_type = unicode
+    class_types = (type, types.ClassType)
+except NameError:
+    text_type = str
+    class_types = (type,)
+iteritems_ = getattr(dict, 'iteritems', dict.items)
+monotonic = getattr(time, 'monotonic', time.time)
+
+
+def isclass(obj):
+    return isinstance(obj, class_types)
+
+
+def getargspec(func):
+    """
+    `inspect.getargspec` is gone from newer Pythons, but the first four
+    fields of `getfullargspec` (args, varargs, varkw, defaults) line up.
+    """
+    import inspect
+    spec = getattr(inspect, 'getfullargspec', None) or inspect.getargspec
+    return spec(func)
+
 # Errors which may be raised
 class BlanketValueError(ValueError): pass
 class BlanketLookupError(LookupError): pass
@@ -36,6 +67,219 @@ class NoOutputHandler(BlanketLookupError): pass
 class NoRouteHandler(BlanketLookupError): pass
 class NoErrorHandler(BlanketLookupError): pass
 class DuplicateRoute(BlanketValueError): pass
+class RequestTooLarge(BlanketValueError): pass
+class DeadlineExceeded(BlanketValueError): pass
+
+
+class LazyMessage(object):
+    """
+    An exception message which is only formatted when something asks for it,
+    so that raising and catching an error (ie: on every 404) doesn't pay for
+    building a listing of every route.
+    """
+    __slots__ = ('template', 'listing', 'kwargs')
+    def __init__(self, template, listing, **kwargs):
+        self.template = template
+        self.listing = listing
+        self.kwargs = kwargs
+
+    def __str__(self):
+        return self.template.format(routes=self.listing(), **self.kwargs)
+
+    def __repr__(self):
+        return repr(str(self))
+
+
+class Reply(namedtuple('Reply', 'status headers body')):
+    """
+    A complete response which needs no rendering, and may be built once and
+    handed out on every request (see `NOT_FOUND`); it's a WSGI application
+    in its own right, rather than a `webob.Response`.
+    """
+    __slots__ = ()
+    def __call__(self, environ, start_response):
+        start_response(self.status, list(self.headers))
+        return [self.body]
+
+
+def make_reply(status, body, headers=()):
+    headers = ((str('Content-Type'), str('text/plain; charset=utf-8')),
+               (str('Content-Length'), str(len(body)))) + tuple(
+        (str(name), str(value)) for name, value in headers)
+    return Reply(status=str(status), headers=headers, body=body)
+
+
+NOT_FOUND = make_reply(status='404 Not Found', body=b'Not Found')
+SERVER_ERROR = make_reply(status='500 Internal Server Error',
+                          body=b'Internal Server Error')
+TIMED_OUT = make_reply(status='504 Gateway Timeout', body=b'Gateway Timeout')
+TOO_LARGE = make_reply(status='413 Request Entity Too Large',
+                       body=b'Request Entity Too Large')
+
+
+def as_timestamp(value):
+    """
+    Last-modified validators may give back a timestamp or a `datetime`
+    (naive ones are taken to be UTC); either way, compare them as whole
+    seconds since the epoch, as that's all HTTP dates can express.
+    """
+    if hasattr(value, 'utctimetuple'):
+        import calendar
+        return calendar.timegm(value.utctimetuple())
+    return int(value)
+
+
+def check_validators(request, etag, last_modified, kwargs):
+    """
+    Run whichever of the `etag` and `last_modified` validators were declared
+    (with the same arguments as the handler), and if the client's
+    `If-None-Match` or `If-Modified-Since` show its copy is current, return
+    a 304 reply so the handler needn't run.
+
+    Otherwise the values are kept on `request.validators` so that the
+    eventual response can carry them.
+    """
+    tag = None
+    if etag is not None:
+        tag = keepcalling(etag, request=request, **kwargs)
+    modified = None
+    if last_modified is not None:
+        modified = keepcalling(last_modified, request=request, **kwargs)
+        if modified is not None:
+            modified = as_timestamp(modified)
+    request.validators = (tag, modified)
+
+    if_none_match = getattr(request, 'if_none_match', None)
+    if tag is not None and if_none_match:
+        if tag in if_none_match:
+            return not_modified(etag=tag, last_modified=modified)
+        return None
+    since = getattr(request, 'if_modified_since', None)
+    if modified is not None and since is not None:
+        if modified <= as_timestamp(since):
+            return not_modified(etag=tag, last_modified=modified)
+    return None
+
+
+def not_modified(etag, last_modified):
+    from webob.datetime_utils import serialize_date
+    headers = []
+    if etag is not None:
+        headers.append((str('ETag'), str('"{tag!s}"'.format(tag=etag))))
+    if last_modified is not None:
+        headers.append((str('Last-Modified'),
+                        str(serialize_date(last_modified))))
+    return Reply(status=str('304 Not Modified'), headers=tuple(headers),
+                 body=b'')
+
+
+def is_default_head(obj):
+    """
+    Whether `head` on this `Httpish` is still the default (which only defers
+    to `get`), as opposed to something a subclass has taken over.
+    """
+    head = getattr(type(obj).head, '__func__', type(obj).head)
+    return head is getattr(Httpish.head, '__func__', Httpish.head)
+
+
+class Limiter(object):
+    """
+    Admission control for a route (or a whole application): at most `limit`
+    requests may be in flight at once, and any more wait up to
+    `queue_timeout` seconds for a slot before being turned away with the
+    preallocated 503 `reply`.
+    """
+    __slots__ = ('limit', 'queue_timeout', 'reply', 'in_flight', 'admitted',
+                 'rejected', 'condition')
+
+    def __init__(self, limit, queue_timeout=0, retry_after=1):
+        if limit < 1:
+            raise BlanketValueError("A concurrency limit must allow at least "
+                                    "one request, not {limit!r}".format(
+                limit=limit))
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self.reply = make_reply(status='503 Service Unavailable',
+                                body=b'Service Unavailable',
+                                headers=(('Retry-After', retry_after),))
+        self.in_flight = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.condition = threading.Condition(threading.Lock())
+
+    def __repr__(self):
+        return ('<blanket.Limiter in_flight={in_flight!r}/{limit!r}, '
+                'admitted={admitted!r}, rejected={rejected!r}>'.format(
+            in_flight=self.in_flight, limit=self.limit,
+            admitted=self.admitted, rejected=self.rejected))
+
+    def stats(self):
+        return {'limit': self.limit, 'in_flight': self.in_flight,
+                'admitted': self.admitted, 'rejected': self.rejected}
+
+    def acquire(self, deadline=None):
+        """
+        Wait up to `queue_timeout` for a slot, or less if the request's
+        `deadline` (a `Deadline`) would pass first.
+        """
+        queue_timeout = self.queue_timeout
+        if deadline is not None:
+            queue_timeout = min(queue_timeout, deadline.remaining())
+        with self.condition:
+            if self.in_flight >= self.limit and queue_timeout > 0:
+                deadline = time.time() + queue_timeout
+                while self.in_flight >= self.limit:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    self.condition.wait(remaining)
+            if self.in_flight >= self.limit:
+                self.rejected += 1
+                return False
+            self.in_flight += 1
+            self.admitted += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify()
+
+
+class Deadline(object):
+    """
+    A time budget of `budget` seconds from now, which can't outlast the
+    deadline it's `within`, if any.
+
+    Set as `request.deadline` when the application or route has one, so
+    handlers may pass the `remaining` time on to whatever they call in turn;
+    `keepcalling` checks it before each step.
+    """
+    __slots__ = ('budget', 'expires')
+    def __init__(self, budget, within=None):
+        self.budget = budget
+        self.expires = monotonic() + budget
+        if within is not None and within.expires < self.expires:
+            self.budget = within.budget
+            self.expires = within.expires
+
+    def __repr__(self):
+        return ('<blanket.Deadline budget={budget!r}, '
+                'remaining={left:.3f}>'.format(budget=self.budget,
+                                               left=self.remaining()))
+
+    def remaining(self):
+        return max(0, self.expires - monotonic())
+
+    def expired(self):
+        return monotonic() >= self.expires
+
+    def check(self):
+        over = monotonic() - self.expires
+        if over >= 0:
+            raise DeadlineExceeded("Deadline of {budget!s}s exceeded by "
+                                   "{over:.3f}s".format(budget=self.budget,
+                                                        over=over))
 
 
 def keepcalling(data, **kwargs):
@@ -52,12 +296,75 @@ def keepcalling(data, **kwargs):
     ...        return z
     ...    return y
     >>> assert keepcalling(x) is True
+
+    If there's a `request` with a `RequestScope` attached, each callable
+    along the way also gets any provided values it asks for by name.
+
+    A `Reply` is callable (as a WSGI application) but is already final, so
+    it's returned as-is.
+
+    If the `request` has a `Deadline`, `DeadlineExceeded` is raised instead
+    of taking another step once it has passed.
     """
-    while callable(data):
-        data = data(**kwargs)
+    request = kwargs.get('request')
+    scope = getattr(request, 'scope', None)
+    deadline = getattr(request, 'deadline', None)
+    while callable(data) and not isinstance(data, Reply):
+        if deadline is not None:
+            deadline.check()
+        if scope is not None:
+            data = data(**scope.inject(data, kwargs))
+        else:
+            data = data(**kwargs)
     return data
 
 
+def is_iterator(obj):
+    return hasattr(obj, '__next__') or hasattr(obj, 'next')
+
+
+_accepted_arguments_cache = {}
+ACCEPTED_ARGUMENTS_CACHE_SIZE = 1024
+
+
+def accepted_arguments(obj):
+    """
+    Find the argument names a callable will accept, as a tuple of the names
+    and whether it also takes `**kwargs`, or `None` if it can't be
+    introspected (builtins, partials etc).
+
+    Results are cached against the underlying function's code, so that bound
+    methods of short lived instances (ie: `Httpish`) and closures made afresh
+    for each request share an entry, and no function is kept alive by it.
+    Anything without code is cached as itself, so the cache is emptied if it
+    ever reaches `ACCEPTED_ARGUMENTS_CACHE_SIZE`.
+    """
+    if isclass(obj):
+        target = obj.__init__
+    elif isinstance(obj, (types.FunctionType, types.MethodType)):
+        target = obj
+    else:
+        target = getattr(obj, '__call__', None)
+    target = getattr(target, '__func__', target)
+    key = getattr(target, '__code__', target)
+    try:
+        return _accepted_arguments_cache[key]
+    except KeyError:
+        pass
+    except TypeError:  # nocover
+        return None
+    try:
+        argspec = getargspec(target)
+    except TypeError:
+        result = None
+    else:
+        result = (frozenset(argspec[0]), argspec[2] is not None)
+    if len(_accepted_arguments_cache) >= ACCEPTED_ARGUMENTS_CACHE_SIZE:
+        _accepted_arguments_cache.clear()
+    _accepted_arguments_cache[key] = result
+    return result
+
+
 class RoutePattern(namedtuple('RoutePattern', 'raw regex')):
     """
     Used as a container for the userland path and the
@@ -72,6 +379,49 @@ class RoutePattern(namedtuple('RoutePattern', 'raw regex')):
         )
 
 
+class LazyRegex(object):
+    """
+    Stands in for a compiled regexp whose source is already known (ie: it
+    was loaded from a route snapshot), deferring the actual `re.compile`
+    until the first time something tries to match against it.
+    """
+    __slots__ = ('pattern', 'flags', 'compiled')
+    def __init__(self, pattern, flags):
+        self.pattern = pattern
+        self.flags = flags
+        self.compiled = None
+
+    def match(self, *args, **kwargs):
+        if self.compiled is None:
+            self.compiled = re.compile(self.pattern, self.flags)
+        return self.compiled.match(*args, **kwargs)
+
+
+class PathRegex(object):
+    """
+    Like `LazyRegex`, but the regexp source is also only worked out (from the
+    raw path) once something asks for it, which for the routes `CompactRoutes`
+    builds in order to dispatch to them is usually never.
+    """
+    __slots__ = ('raw', 'flags', 'source', 'compiled')
+    def __init__(self, raw):
+        self.raw = raw
+        self.flags = re.IGNORECASE
+        self.source = None
+        self.compiled = None
+
+    @property
+    def pattern(self):
+        if self.source is None:
+            self.source = URLTransformRegistry().source(path=self.raw)
+        return self.source
+
+    def match(self, *args, **kwargs):
+        if self.compiled is None:
+            self.compiled = re.compile(self.pattern, self.flags)
+        return self.compiled.match(*args, **kwargs)
+
+
 class URLTransformRegistry(object):
     __slots__ = ('prefix_transformers', 'suffix_transformers')
     def __init__(self, prefix_transformers=None, suffix_transformers=None):
@@ -115,7 +465,7 @@ class URLTransformRegistry(object):
             mod=self.__class__.__module__, cls=self.__class__.__name__,
         ))
 
-    def make(self, path):
+    def transform(self, path):
         """
         if any of the transform values is a function, it will be called
         and passed the `needle`, `haystack` and `updated_haystack` parameters.
@@ -127,11 +477,21 @@ class URLTransformRegistry(object):
                     final_to_ = keepcalling(to_, needle=from_, haystack=path,
                                             updated_haystack=path_updated)
                     path_updated = path_updated.replace(from_, final_to_)
+        return path_updated
+
+    def source(self, path):
+        """
+        The anchored regexp source for `path`, without compiling it.
+        """
+        path_updated = self.transform(path=path)
         if not path_updated.startswith('/'):
             final_path = '^/{path!s}$'.format(path=path_updated)
         else:
             final_path = '^{path!s}$'.format(path=path_updated)
-        regex = re.compile(final_path, re.IGNORECASE)
+        return final_path
+
+    def make(self, path):
+        regex = re.compile(self.source(path=path), re.IGNORECASE)
         return RoutePattern(raw=path, regex=regex)
 
 
@@ -156,6 +516,7 @@ class Output(object):
         return response
 
 def json_renderer(request, context):
+    import json
     try:
         return json.dumps(context, indent=4, check_circular=True).encode('UTF-8')
     except (TypeError, ValueError):
@@ -166,26 +527,148 @@ JSON = Output(responds_to=('application/json', 'application/javascript'),
               responds_with=json_renderer)
 
 
-try:
-    # noinspection PyUnresolvedReferences
-    import chevron
-    def mustache_template_renderer(request, context):
-        render = partial(chevron.render, data=context)
-        if 'template_file' in context:
-            with open(context['template_file'], 'r') as template:
-                return render(template=template)
-        elif 'template' in context:
-            return render(template=context['template'])
-        return None
-except ImportError:
-    def mustache_template_renderer(*args, **kwargs):
+def mustache_template_renderer(request, context):
+    try:
+        # noinspection PyUnresolvedReferences
+        import chevron
+    except ImportError:
         raise NoOutputHandler("`chevron` must be installed to use the default "
                               "`mustache` implementation")
+    render = partial(chevron.render, data=context)
+    if 'template_file' in context:
+        with open(context['template_file'], 'r') as template:
+            return render(template=template)
+    elif 'template' in context:
+        return render(template=context['template'])
+    return None
 
 mustache = Output(responds_to=('text/html',),
                   responds_with=mustache_template_renderer)
 
 
+class Compressor(object):
+    """
+    Negotiates a `Content-Encoding` from `Accept-Encoding` and compresses
+    rendered output with it.
+
+    Bodies under `min_size` are left alone, iterable bodies are compressed
+    as they stream, and the compressed form of recently seen bodies is kept
+    (keyed by encoding and digest) so that hot responses which render
+    identically aren't compressed again on every request.
+
+    The cache is least recently used first out, so each compressed response
+    briefly takes `lock` to update it.
+    """
+    __slots__ = ('min_size', 'level', 'encodings', 'cache', 'cache_size',
+                 'lock', 'brotli')
+
+    def __init__(self, min_size=1024, level=6,
+                 encodings=('br', 'gzip', 'deflate'), cache_size=128):
+        try:
+            # noinspection PyUnresolvedReferences
+            import brotli
+        except ImportError:
+            brotli = None
+        if brotli is None:
+            encodings = tuple(name for name in encodings if name != 'br')
+        self.brotli = brotli
+        self.min_size = min_size
+        self.level = level
+        self.encodings = tuple(encodings)
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return ('<{cls} encodings=({encodings!s}), min_size={size!r}, '
+                'cached={cached!r}>'.format(
+            cls=self.__class__.__name__, encodings=', '.join(self.encodings),
+            size=self.min_size, cached=len(self.cache)))
+
+    def negotiate(self, header):
+        """
+        Pick the first of our `encodings` the client accepts with the
+        highest quality, or `None` to send the body as-is.
+        """
+        if not header:
+            return None
+        accepted = {}
+        for part in header.split(','):
+            name, _, params = part.strip().partition(';')
+            quality = 1.0
+            params = params.strip()
+            if params.startswith('q='):
+                try:
+                    quality = float(params[2:])
+                except ValueError:
+                    quality = 0.0
+            accepted[name.strip().lower()] = quality
+        wildcard = accepted.get('*', 0.0)
+        best, best_quality = None, 0.0
+        for name in self.encodings:
+            quality = accepted.get(name, wildcard)
+            if quality > best_quality:
+                best, best_quality = name, quality
+        return best
+
+    def compressobj(self, encoding):
+        import zlib
+        if encoding == 'br':
+            return self.brotli.Compressor()
+        wbits = zlib.MAX_WBITS | 16 if encoding == 'gzip' else zlib.MAX_WBITS
+        return zlib.compressobj(self.level, zlib.DEFLATED, wbits)
+
+    def compress(self, encoding, body):
+        import hashlib
+        key = (encoding, hashlib.sha1(body).digest())
+        # reading doesn't need the lock; only reordering and inserting do, so
+        # a compressed response takes it once either way.
+        compressed = self.cache.get(key)
+        if compressed is not None:
+            with self.lock:
+                # re-inserted, so the least recently used goes first.
+                if self.cache.pop(key, None) is not None:
+                    self.cache[key] = compressed
+            return compressed
+        if encoding == 'br':
+            compressed = self.brotli.compress(body)
+        else:
+            compressor = self.compressobj(encoding)
+            compressed = compressor.compress(body) + compressor.flush()
+        with self.lock:
+            self.cache[key] = compressed
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return compressed
+
+    def stream(self, encoding, chunks):
+        compressor = self.compressobj(encoding)
+        if encoding == 'br':
+            compress, finish = compressor.process, compressor.finish
+        else:
+            compress, finish = compressor.compress, compressor.flush
+        for chunk in chunks:
+            data = compress(chunk)
+            if data:
+                yield data
+        yield finish()
+
+    def __call__(self, request, body):
+        """
+        Returns the `(encoding, body)` to send, where `body` is either bytes
+        or an iterable of them, as it was given.
+        """
+        streaming = not isinstance(body, bytes)
+        if not streaming and len(body) < self.min_size:
+            return None, body
+        encoding = self.negotiate(request.headers.get('Accept-Encoding'))
+        if encoding is None:
+            return None, body
+        if streaming:
+            return encoding, self.stream(encoding=encoding, chunks=body)
+        return encoding, self.compress(encoding=encoding, body=body)
+
+
 def get_name_from_obj(obj):  # nocover
     """
     This pretty much only exists right now for the purposes of the
@@ -206,7 +689,51 @@ def get_name_from_obj(obj):  # nocover
     return name
 
 
-class Route(namedtuple('Route', 'pattern handler outputs')):
+SNAPSHOT_VERSION = 1
+
+
+def handler_signature(handler):
+    """
+    The argument names and number of defaults of the function underneath
+    `handler`, read straight from its code rather than via `getargspec`, or
+    an empty string for things without any (builtins etc).
+    """
+    if isclass(handler):
+        target = handler.__init__
+    elif isinstance(handler, (types.FunctionType, types.MethodType)):
+        target = handler
+    else:
+        target = getattr(handler, '__call__', None)
+    target = getattr(target, '__func__', target)
+    code = getattr(target, '__code__', None)
+    if code is None:
+        return ''
+    defaults = getattr(target, '__defaults__', None) or ()
+    return '{names!s}/{defaults!s}'.format(
+        names=','.join(code.co_varnames[:code.co_argcount]),
+        defaults=len(defaults))
+
+
+def registration_key(path, handler, providers=(), captures=()):
+    """
+    A hash of the things which identify a route registration, and everything
+    `Router.check_arguments` depends on, without needing to introspect the
+    handler or build the regexp; used to decide whether a snapshot entry may
+    stand in for a call to `Router.prepare`.
+    """
+    import hashlib
+    key = '\x00'.join((
+        path, get_name_from_obj(handler), handler_signature(handler),
+        ','.join(sorted(providers)), ','.join(sorted(captures)),
+    ))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+class Route(namedtuple('Route', 'pattern handler outputs limiter deadline')):
+    def __new__(cls, pattern, handler, outputs, limiter=None, deadline=None):
+        return super(Route, cls).__new__(cls, pattern, handler, outputs,
+                                         limiter, deadline)
+
     @property
     def log(self):
         return logging.getLogger(get_name_from_obj(self))
@@ -223,29 +750,108 @@ class Route(namedtuple('Route', 'pattern handler outputs')):
             cls=self.__class__.__name__, outputs=self.outputs,
         ))
 
-    def __call__(self, request):
+    def __call__(self, request, captures=None):
         match = self.handles(value=request.path)
         if match is not None:
             match_kwargs = match.groupdict()
+            if captures:
+                match_kwargs.update(captures)
             self.log.debug("{route!r} wants to handle `{path!s}` and "
                            "provide the following parameters: "
                            "{params!r}".format(route=self,
                                                path=request.path,
                                                params=match_kwargs))
-            return keepcalling(self.handler, request=request,
-                               **match_kwargs)
+            return self.dispatch(request=request, kwargs=match_kwargs)
         return None
 
+    def dispatch(self, request, kwargs):
+        """
+        Run the handler for an already matched path, noting on the `request`
+        which route ran so that its `outputs` may be used for rendering.
+
+        If the route has a `limiter` and is already at capacity, its 503
+        reply is returned without calling the handler.
+
+        If the route has a `deadline` (in seconds), the handler runs under a
+        `Deadline` for it, cut short by any the request already has; should
+        the handler decline, the request's own is put back for the next
+        route to try, and any validators it produced are dropped.
+        """
+        request.route = self
+        if self.deadline is not None:
+            previous = getattr(request, 'deadline', None)
+            request.deadline = Deadline(budget=self.deadline, within=previous)
+        result = self.run(request=request, kwargs=kwargs)
+        if result is None:
+            # the next route to try mustn't inherit anything from this one.
+            if self.deadline is not None:
+                request.deadline = previous
+            if getattr(request, 'validators', None) is not None:
+                request.validators = None
+        return result
+
+    def run(self, request, kwargs):
+        """
+        A function handler may declare cheap `etag` and/or `last_modified`
+        validators as attributes of itself, in which case GET and HEAD
+        requests are checked against them first (see `check_validators`),
+        and HEAD requests don't call the handler at all.
+
+        Because a 304 (or a HEAD) never reaches the handler, a handler which
+        may decline should have its validators return `None` for the same
+        arguments, so the request carries on to the next route instead.
+        """
+        handler = self.handler
+        if request.method in ('GET', 'HEAD') and not isclass(handler):
+            etag = getattr(handler, 'etag', None)
+            last_modified = getattr(handler, 'last_modified', None)
+            if etag is not None or last_modified is not None:
+                reply = check_validators(request=request, etag=etag,
+                                         last_modified=last_modified,
+                                         kwargs=kwargs)
+                if reply is not None:
+                    return reply
+                if request.method == 'HEAD':
+                    return {}
+        if self.limiter is None:
+            return keepcalling(self.handler, request=request, **kwargs)
+        if not self.limiter.acquire(deadline=getattr(request, 'deadline',
+                                                     None)):
+            return self.limiter.reply
+        try:
+            return keepcalling(self.handler, request=request, **kwargs)
+        finally:
+            self.limiter.release()
+
 
 class Router(object):
-    __slots__ = ('routes', 'seen_routes', 'application')
+    """
+    The route table is append-only: `add` extends `routes` and `seen_routes`
+    while holding `lock`, and nothing ever removes or reorders entries. A
+    single `list.append` is atomic, so anything reading the table (ie:
+    `__call__`) needs no lock; it sees each route either fully added or not
+    at all. Readers must not iterate `seen_routes`, which may be growing,
+    and should go through `routes` instead.
+
+    Copying the whole table on every `add` would give the same guarantee,
+    but turns registering N routes into O(N^2) work.
+
+    `captures` names the arguments every route here is given from outside
+    the path (ie: by a `HostRouter`).
+    """
+    __slots__ = ('routes', 'seen_routes', 'application', 'snapshot', 'lock',
+                 'captures')
     def __init__(self, application=None):
         self.application = application
         self.routes = []
         self.seen_routes = set()
+        self.snapshot = None
+        self.lock = threading.Lock()
+        self.captures = ()
 
-    def make_route(self, route_value, handler, outputs):
-        return Route(pattern=route_value, handler=handler, outputs=outputs)
+    def make_route(self, route_value, handler, outputs, **options):
+        return Route(pattern=route_value, handler=handler, outputs=outputs,
+                     **options)
 
     @property
     def log(self):
@@ -261,7 +867,74 @@ class Router(object):
         return '<{name!s} routes={routes!r}{trailing!s}>'.format(
             routes=top3, trailing=trailing, name=get_name_from_obj(self))
 
+    def from_snapshot(self, value, handler):
+        """
+        If a snapshot has been restored, and the entry at this position was
+        made from the same registration, re-use its regexp source instead of
+        introspecting the handler and transforming the path again.
+
+        The first mismatch invalidates the whole snapshot, because every
+        subsequent position is then suspect.
+        """
+        if self.snapshot is None:
+            return None
+        position = len(self.routes)
+        key = self.registration_key(path=value, handler=handler)
+        try:
+            entry_key, pattern, flags = self.snapshot[position]
+        except IndexError:
+            entry_key = None
+        if entry_key != key:
+            self.log.info("Route snapshot is stale at position {index!s} "
+                          "(`{path!s}`), discarding it".format(index=position,
+                                                              path=value))
+            self.snapshot = None
+            return None
+        return RoutePattern(raw=value, regex=LazyRegex(pattern=pattern,
+                                                       flags=flags))
+
+    def registration_key(self, path, handler):
+        return registration_key(
+            path=path, handler=handler, captures=self.captures,
+            providers=getattr(self.application, 'providers', ()))
+
+    def dump(self):
+        """
+        Export the prepared route table in route order, as something
+        which `json` can serialize and `restore` can accept.
+        """
+        return {
+            'version': SNAPSHOT_VERSION,
+            'routes': [{
+                'key': self.registration_key(path=route.pattern.raw,
+                                             handler=route.handler),
+                'pattern': route.pattern.regex.pattern,
+                'flags': route.pattern.regex.flags,
+            } for route in self],
+        }
+
+    def restore(self, snapshot):
+        """
+        Accept the output of `dump` (possibly from a previous process) so that
+        subsequent calls to `add` may skip `prepare` where the registration
+        is unchanged.
+        """
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            raise BlanketValueError("Route snapshot version {got!r} is not "
+                                    "supported, expected {expected!r}".format(
+                got=snapshot.get('version'), expected=SNAPSHOT_VERSION))
+        self.snapshot = tuple((entry['key'], entry['pattern'], entry['flags'])
+                              for entry in snapshot['routes'])
+
     def prepare(self, value, handler, outputs):
+        cached = self.from_snapshot(value=value, handler=handler)
+        if cached is not None:
+            return cached
+        self.check_arguments(value=value, handler=handler)
+        transformer = URLTransformRegistry()
+        return transformer.make(path=value)
+
+    def check_arguments(self, value, handler):
         argspec = getargspec(handler)
         all_arguments = argspec.args
         required_arguments = all_arguments[:]
@@ -274,7 +947,12 @@ class Router(object):
         if 'request' in required_arguments:
             required_arguments.remove('request')
 
-        arguments_in_path = value.count('{')
+        # anything a provider will supply doesn't come from the path.
+        providers = getattr(self.application, 'providers', ())
+        required_arguments = [name for name in required_arguments
+                              if name not in providers]
+
+        arguments_in_path = value.count('{') + len(self.captures)
         if len(required_arguments) != arguments_in_path:
             raise BlanketValueError('Handler {handler!r} takes a different '
                                     'number of arguments ({args!s}) than has '
@@ -282,25 +960,26 @@ class Router(object):
                                     'template: {path!s}'.format(
                 handler=handler, path=value,
                 args=', '.join(required_arguments)))
-        transformer = URLTransformRegistry()
-        return transformer.make(path=value)
 
-    def add(self, thing, handler, outputs):
-        route_pattern = self.prepare(value=thing, handler=handler,
-                                     outputs=outputs)
-        # handle duplicate mount points ...
-        if route_pattern.raw in self.seen_routes:
-            raise DuplicateRoute("`{path!s}` has already been added to "
-                                 "this <blanket.Router>".format(
-                path=route_pattern.raw))
-
-        self.log.debug("{route!r} is being added onto {count} existing "
-                       "routes".format(route=route_pattern, count=len(self)))
-
-        self.seen_routes.add(route_pattern.raw)
-        route = self.make_route(route_value=route_pattern, handler=handler,
-                                outputs=outputs)
-        self.routes.append(route)
+    def add(self, thing, handler, outputs, **options):
+        with self.lock:
+            route_pattern = self.prepare(value=thing, handler=handler,
+                                         outputs=outputs)
+            # handle duplicate mount points ...
+            if route_pattern.raw in self.seen_routes:
+                raise DuplicateRoute("`{path!s}` has already been added to "
+                                     "this <blanket.Router>".format(
+                    path=route_pattern.raw))
+
+            self.log.debug("{route!r} is being added onto {count} existing "
+                           "routes".format(route=route_pattern,
+                                           count=len(self)))
+
+            route = self.make_route(route_value=route_pattern,
+                                    handler=handler, outputs=outputs,
+                                    **options)
+            self.seen_routes.add(route_pattern.raw)
+            self.routes.append(route)
 
     def __iter__(self):
         return iter(self.routes)
@@ -311,18 +990,436 @@ class Router(object):
     def __len__(self):
         # this rather convoluted length check should mean I can tell if there's
         # any drift between the set and the list.
-        return (len(self.routes) + len(self.seen_routes)) / 2
+        return (len(self.routes) + len(self.seen_routes)) // 2
+
+    def matches(self, path):
+        """
+        Yield every route which would accept `path`, in order, along with the
+        parameters it extracted; because a handler may still return `None`
+        to decline, the first of these isn't necessarily the one used.
+        """
+        for route in self.routes:
+            match = route.handles(value=path)
+            if match is not None:
+                yield route, match.groupdict()
+
+    def listing(self):
+        return tuple(sorted(route.pattern.raw for route in self.routes))
+
+    def limiters(self):
+        """
+        Yield the path and `Limiter` of every route which has one.
+        """
+        for route in self.routes:
+            if route.limiter is not None:
+                yield route.pattern.raw, route.limiter
+
+    def find(self, request, captures=None):
+        """
+        Like calling the router, but a miss is just `None` rather than an
+        exception.
+        """
+        for route in self.routes:
+            result = route(request=request, captures=captures)
+            if result is not None:
+                return result
+        return None
+
+    def no_route(self, path):
+        return NoRouteHandler(LazyMessage(
+            "`{path}` does not match any of the given routes: {routes!r}",
+            listing=self.listing, path=path))
 
     def __call__(self, request):
-        if request.path not in self:
-            raise Exception('reminder to self, change this')
-        for route in self:
-            result = route(request=request)
+        result = self.find(request=request)
+        if result is None:
+            raise self.no_route(path=request.path)
+        return result
+
+
+# characters which would make a literal part of a path mean something else
+# once it's part of a regexp, along with the start of a placeholder.
+PATTERN_CHARACTERS = frozenset('.^$*+?{}[]\\|()')
+
+
+def split_path(path):
+    """
+    Split a (leading slash) path into the literal prefix which can be
+    compared as plain text, and the remainder, which needs a regexp; the
+    remainder is empty if the whole path is literal.
+    """
+    for index, character in enumerate(path):
+        if character in PATTERN_CHARACTERS:
+            return path[:index], path[index:]
+    return path, ''
+
+
+def add_position(mapping, key, position):
+    """
+    Buckets hold a bare position until a second one arrives, as most keys
+    only ever see one route.
+    """
+    existing = mapping.get(key)
+    if existing is None:
+        mapping[key] = position
+    elif isinstance(existing, int):
+        mapping[key] = [existing, position]
+    else:
+        existing.append(position)
+
+
+def get_positions(mapping, key):
+    existing = mapping.get(key)
+    if existing is None:
+        return ()
+    elif isinstance(existing, int):
+        return (existing,)
+    return existing
+
+
+class CompactRoutes(object):
+    """
+    The route table for `CompactRouter`, kept as parallel lists rather than
+    a `Route`, `RoutePattern` and compiled regexp per entry.
+
+    The literal prefix of each path is indexed for plain text lookups (whole
+    paths in `static`, prefixes in `dynamic`) and only the remainder is a
+    regexp, which is shared by every route with the same remainder, so
+    `/a/{id!d}` and `/b/{id!d}` compile `{id!d}` once between them. Equal
+    `outputs` are shared too, and `options` (ie: a `limiter`) are only kept
+    for the routes which have any.
+
+    `Route` instances are built when something asks for one, which is only
+    the route actually dispatched to, or introspection.
+
+    Like `Router`, this is append-only, and a position is published into the
+    indexes only after everything else about it has been stored.
+    """
+    __slots__ = ('raws', 'handlers', 'outputs', 'shapes', 'options',
+                 'static', 'dynamic', 'prefix_lengths', 'shape_positions',
+                 'shape_regexes', 'shared_outputs')
+    def __init__(self):
+        self.raws = []
+        self.handlers = []
+        self.outputs = []
+        self.shapes = []
+        self.options = {}
+        self.static = {}
+        self.dynamic = {}
+        self.prefix_lengths = ()
+        self.shape_positions = {}
+        self.shape_regexes = []
+        self.shared_outputs = {}
+
+    def __len__(self):
+        return len(self.raws)
+
+    def __iter__(self):
+        for position in range(len(self.raws)):
+            yield self.route(position=position)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.route(position=position)
+                    for position in range(*index.indices(len(self.raws)))]
+        if index < 0:
+            index += len(self.raws)
+        if not 0 <= index < len(self.raws):
+            raise IndexError(index)
+        return self.route(position=index)
+
+    def route(self, position):
+        raw = self.raws[position]
+        options = self.options.get(position)
+        if options is None:
+            return Route(pattern=RoutePattern(raw=raw, regex=PathRegex(raw)),
+                         handler=self.handlers[position],
+                         outputs=self.outputs[position])
+        return Route(pattern=RoutePattern(raw=raw, regex=PathRegex(raw)),
+                     handler=self.handlers[position],
+                     outputs=self.outputs[position], **options)
+
+    def shape(self, remainder):
+        if remainder not in self.shape_positions:
+            source = URLTransformRegistry().transform(path=remainder)
+            self.shape_regexes.append(re.compile('{source!s}$'.format(
+                source=source), re.IGNORECASE))
+            self.shape_positions[remainder] = len(self.shape_regexes) - 1
+        return self.shape_positions[remainder]
+
+    def locate(self, raw):
+        """
+        The keys which would index `raw`: the lowercased literal prefix, and
+        the remainder, which is empty for a wholly literal path.
+        """
+        if not raw.startswith('/'):
+            raw = '/{raw!s}'.format(raw=raw)
+        prefix, remainder = split_path(raw)
+        return prefix.lower(), remainder
+
+    def position(self, raw):
+        """
+        Where `raw` was added, or `None`
+        """
+        prefix, remainder = self.locate(raw=raw)
+        index = self.dynamic if remainder else self.static
+        for position in get_positions(index, prefix):
+            if self.raws[position] == raw:
+                return position
+        return None
+
+    def append(self, raw, handler, outputs, **options):
+        prefix, remainder = self.locate(raw=raw)
+        try:
+            outputs = self.shared_outputs.setdefault(outputs, outputs)
+        except TypeError:
+            pass
+        position = len(self.raws)
+        self.shapes.append(self.shape(remainder) if remainder else None)
+        self.handlers.append(handler)
+        self.outputs.append(outputs)
+        options = {key: value for key, value in iteritems_(options)
+                   if value is not None}
+        if options:
+            self.options[position] = options
+        self.raws.append(raw)
+        if remainder:
+            if len(prefix) not in self.prefix_lengths:
+                self.prefix_lengths = tuple(sorted(self.prefix_lengths +
+                                                   (len(prefix),)))
+            add_position(self.dynamic, prefix, position)
+        else:
+            add_position(self.static, prefix, position)
+        return position
+
+    def matching(self, path):
+        """
+        Yield the position of every route accepting `path`, in order, along
+        with the parameters it extracted.
+        """
+        lowered = path.lower()
+        candidates = [(position, None)
+                      for position in get_positions(self.static, lowered)]
+        for length in self.prefix_lengths:
+            if length > len(lowered):
+                break
+            candidates.extend((position, length) for position in
+                              get_positions(self.dynamic, lowered[:length]))
+        candidates.sort()
+        for position, offset in candidates:
+            if offset is None:
+                yield position, {}
+                continue
+            regex = self.shape_regexes[self.shapes[position]]
+            match = regex.match(path, offset)
+            if match is not None:
+                yield position, match.groupdict()
+
+
+class CompactRouter(Router):
+    """
+    A `Router` for very large route tables, storing them as a
+    `CompactRoutes` (see there) rather than a list of `Route` instances.
+
+    Routes are checked in the same order, and matching is the same, except
+    that only the routes whose literal prefix fits the path are tried. Opt in
+    with the `compact_routes` configuration option of `Blanket`.
+    """
+    __slots__ = ()
+    def __init__(self, application=None):
+        super(CompactRouter, self).__init__(application=application)
+        self.routes = CompactRoutes()
+
+    def prepare(self, value, handler, outputs):
+        # the regexps are built per shape by the table, so only the handler
+        # needs checking; a matching snapshot entry means even that's done.
+        if self.from_snapshot(value=value, handler=handler) is None:
+            self.check_arguments(value=value, handler=handler)
+        return RoutePattern(raw=value, regex=None)
+
+    def add(self, thing, handler, outputs, **options):
+        with self.lock:
+            self.prepare(value=thing, handler=handler, outputs=outputs)
+            if self.routes.position(raw=thing) is not None:
+                raise DuplicateRoute("`{path!s}` has already been added to "
+                                     "this <blanket.Router>".format(
+                    path=thing))
+            self.routes.append(raw=thing, handler=handler, outputs=outputs,
+                               **options)
+
+    def __contains__(self, item):
+        # like matching a regexp against it, anything but a string is a
+        # TypeError (see `Blanket.__contains__`).
+        if not isinstance(item, (str, text_type)):
+            raise TypeError("Routes can only contain paths, not "
+                            "{item!r}".format(item=item))
+        return any(True for _ in self.routes.matching(path=item))
+
+    def __len__(self):
+        return len(self.routes)
+
+    def matches(self, path):
+        for position, kwargs in self.routes.matching(path=path):
+            yield self.routes.route(position=position), kwargs
+
+    def listing(self):
+        return tuple(sorted(self.routes.raws))
+
+    def limiters(self):
+        for position, options in sorted(iteritems_(self.routes.options)):
+            if options.get('limiter') is not None:
+                yield self.routes.raws[position], options['limiter']
+
+    def find(self, request, captures=None):
+        for position, kwargs in self.routes.matching(path=request.path):
+            if captures:
+                kwargs.update(captures)
+            route = self.routes.route(position=position)
+            result = route.dispatch(request=request, kwargs=kwargs)
             if result is not None:
                 return result
-        raise NoRouteHandler("`{path}` does not match any of the given "
-                             "routes: {routes!r}".format(
-            path=request.path, routes=tuple(sorted(self.seen_routes))))
+        return None
+
+
+class HostPattern(namedtuple('HostPattern', 'raw label router')):
+    """
+    A host with a wildcard (`label` is `None`) or captures (`label` is a
+    regexp) for its leftmost label, and the `Router` for its routes.
+    """
+    __slots__ = ()
+    def __repr__(self):
+        return "<blanket.HostPattern raw='{raw!s}'>".format(raw=self.raw)
+
+
+def normalize_host(host):
+    """
+    Lowercase `host` and remove any port and trailing dot, so that
+    `Example.com.:8080` and `example.com` are the same thing.
+    """
+    host = host.lower()
+    if not host.endswith(']'):  # an IPv6 literal has colons, but no port
+        name, colon, port = host.rpartition(':')
+        if colon and port.isdigit():
+            host = name
+    return host.rstrip('.')
+
+
+class HostRouter(object):
+    """
+    A `Router` per host, so a request is only matched against the routes
+    for the host it was made to.
+
+    Hosts may be exact (`example.com`), or have a wildcard
+    (`*.example.com`) or captures (`{tenant!slug}.example.com`) as their
+    leftmost label, which matches exactly one label; captures are passed
+    to the handler like those from the path. Exact hosts are found in
+    `exact`, and the rest by the remainder of the host in `wildcards`, so
+    choosing a `Router` doesn't depend on how many hosts there are. Exact
+    hosts take precedence, then the others in the order they were added.
+
+    Like `Router`, this only grows, and each host's `Router` is published
+    once its first route has been added.
+    """
+    __slots__ = ('application', 'router_class', 'exact', 'wildcards', 'lock')
+    def __init__(self, application=None, router_class=Router):
+        self.application = application
+        self.router_class = router_class
+        self.exact = {}
+        self.wildcards = {}
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return '<blanket.HostRouter hosts={hosts!r}>'.format(
+            hosts=self.listing())
+
+    def __iter__(self):
+        for host, router in iteritems_(self.exact):
+            yield host, router
+        for patterns in tuple(self.wildcards.values()):
+            for pattern in patterns:
+                yield pattern.raw, pattern.router
+
+    def __len__(self):
+        return sum(len(router) for host, router in self)
+
+    def __nonzero__(self):
+        return bool(self.exact or self.wildcards)
+    __bool__ = __nonzero__
+
+    def listing(self):
+        return tuple(sorted(host for host, router in self))
+
+    def parse(self, host):
+        """
+        Split a host into its leftmost label and the remainder; the label is
+        `None` for an exact host, `'*'` for a wildcard, and otherwise the
+        (uncompiled) label with captures.
+        """
+        host = normalize_host(host)
+        label, _, remainder = host.partition('.')
+        if '*' in remainder or '{' in remainder:
+            raise BlanketValueError("Only the leftmost label of `{host!s}` "
+                                    "may be a wildcard or capture".format(
+                host=host))
+        if label == '*' or '{' in label:
+            if not remainder:
+                raise BlanketValueError("`{host!s}` would match every "
+                                        "host".format(host=host))
+            return host, label, remainder
+        if '*' in label:
+            raise BlanketValueError("A wildcard must be the whole of the "
+                                    "leftmost label of `{host!s}`".format(
+                host=host))
+        return host, None, remainder
+
+    def add(self, host, thing, handler, outputs, **options):
+        with self.lock:
+            host, label, remainder = self.parse(host=host)
+            if label is None:
+                router = self.exact.get(host)
+            else:
+                router = next((pattern.router for pattern in
+                               self.wildcards.get(remainder, ())
+                               if pattern.raw == host), None)
+            if router is not None:
+                return router.add(thing=thing, handler=handler,
+                                  outputs=outputs, **options)
+
+            router = self.router_class(application=self.application)
+            regex = None
+            if label is not None and label != '*':
+                transformer = URLTransformRegistry()
+                regex = re.compile('^{label!s}$'.format(
+                    label=transformer.transform(path=label)), re.IGNORECASE)
+                router.captures = tuple(regex.groupindex)
+            router.add(thing=thing, handler=handler, outputs=outputs,
+                       **options)
+            if label is None:
+                self.exact[host] = router
+            else:
+                pattern = HostPattern(raw=host, label=regex, router=router)
+                self.wildcards[remainder] = self.wildcards.get(
+                    remainder, ()) + (pattern,)
+
+    def select(self, host):
+        """
+        Find the `Router` for `host`, and anything captured from it, or
+        `None` if no routes were added for it.
+        """
+        host = normalize_host(host)
+        router = self.exact.get(host)
+        if router is not None:
+            return router, None
+        label, _, remainder = host.partition('.')
+        if not label:
+            return None, None
+        for pattern in self.wildcards.get(remainder, ()):
+            if pattern.label is None:
+                return pattern.router, None
+            match = pattern.label.match(label)
+            if match is not None:
+                return pattern.router, match.groupdict()
+        return None, None
 
 
 class ErrorRoute(namedtuple('ErrorRoute', 'exception_class handler outputs')):
@@ -352,9 +1449,9 @@ class ErrorRoute(namedtuple('ErrorRoute', 'exception_class handler outputs')):
 
 class ErrorRouter(Router):
 
-    __slots__ = ('routes', 'seen_routes', 'application')
+    __slots__ = ('routes', 'seen_routes', 'application', 'snapshot', 'lock')
 
-    def make_route(self, route_value, handler, outputs):
+    def make_route(self, route_value, handler, outputs, **options):
         return ErrorRoute(exception_class=route_value, handler=handler,
                            outputs=outputs)
 
@@ -366,15 +1463,99 @@ class ErrorRouter(Router):
         return RoutePattern(raw=value, regex=None)
 
     def __call__(self, exception, request=None):
-        for route in self:
+        for route in self.routes:
             if route.handles(value=exception):
+                if request is not None:
+                    request.route = route
+                    # error handlers are the last thing to run, and must be
+                    # able to run even once the deadline has passed.
+                    if getattr(request, 'deadline', None) is not None:
+                        request.deadline = None
                 return keepcalling(route.handler, exception=exception,
                                    request=request)
-        raise NoErrorHandler("exception `{exc!r}` ({val!s}) does not match any "
-                             "of the given error types: {routes!r}".format(
-            exc=exception.__class__, val=exception,
-            routes=tuple(sorted(self.seen_routes)))
-        )
+        raise NoErrorHandler(LazyMessage(
+            "exception `{exc!r}` ({val!s}) does not match any of the given "
+            "error types: {routes!r}", listing=self.listing,
+            exc=exception.__class__, val=exception))
+
+    def listing(self):
+        return tuple(sorted(route.exception_class.raw for route in self.routes))
+
+    def catches(self, exception_class):
+        return any(route.handles(value=exception_class)
+                   for route in self.routes)
+
+
+class RequestScope(object):
+    """
+    A per-request memo of values produced by the providers registered via
+    `Blanket.provide`. Each provider runs lazily, at most once per request,
+    the first time a handler anywhere in the chain asks for it by argument
+    name (or it is looked up directly, ie: `request.scope['user']`)
+    """
+    __slots__ = ('providers', 'request', 'values', 'resolving')
+
+    def __init__(self, providers, request):
+        self.providers = providers
+        self.request = request
+        self.values = {}
+        self.resolving = set()
+
+    def __contains__(self, item):
+        return item in self.values
+
+    def __getitem__(self, item):
+        return self.resolve(name=item, kwargs={'request': self.request})
+
+    def __repr__(self):
+        return ('<blanket.RequestScope provides={names!r}, '
+                'resolved={done!r}>'.format(names=tuple(sorted(self.providers)),
+                                            done=tuple(sorted(self.values))))
+
+    def resolve(self, name, kwargs):
+        try:
+            return self.values[name]
+        except KeyError:
+            pass
+        try:
+            provider = self.providers[name]
+        except KeyError:
+            raise BlanketLookupError("No provider for `{name!s}` has been "
+                                     "registered".format(name=name))
+        if name in self.resolving:
+            raise BlanketValueError("Provider for `{name!s}` depends on "
+                                    "itself".format(name=name))
+        self.resolving.add(name)
+        try:
+            available = self.inject(provider, kwargs)
+            spec = accepted_arguments(provider)
+            if spec is not None and not spec[1]:
+                available = {k: v for k, v in iteritems_(available)
+                             if k in spec[0]}
+            value = keepcalling(provider, **available)
+        finally:
+            self.resolving.discard(name)
+        self.values[name] = value
+        return value
+
+    def inject(self, func, kwargs):
+        """
+        Returns `kwargs` with any provided values `func` asks for added in;
+        the original `kwargs` are returned untouched if there's nothing to do.
+        """
+        if not self.providers:
+            return kwargs
+        spec = accepted_arguments(func)
+        if spec is None:
+            return kwargs
+        wanted = [name for name in spec[0]
+                  if name in self.providers and name not in kwargs]
+        if not wanted:
+            return kwargs
+        injected = dict(kwargs)
+        for name in wanted:
+            injected[name] = self.resolve(name=name, kwargs=kwargs)
+        return injected
 
 
 class ManyHandler(object):
@@ -395,7 +1576,15 @@ class ManyHandler(object):
 
 
 class Httpish(object):
+    """
+    Subclasses may implement `etag` and/or `last_modified` (taking the same
+    arguments as `get`) to make GET and HEAD conditional; see
+    `check_validators`. With either in place, HEAD doesn't call `get` at all,
+    unless `head` has been overridden.
+    """
     __slots__ = ('init_kwargs',)
+    etag = None
+    last_modified = None
 
     def __init__(self, request, **kwargs):
         self.init_kwargs = kwargs
@@ -405,8 +1594,21 @@ class Httpish(object):
             func = getattr(self, request.method.lower())
         except AttributeError as exc:
             return None
+        if request.method in ('GET', 'HEAD') and (
+                self.etag is not None or self.last_modified is not None):
+            reply = check_validators(request=request, etag=self.etag,
+                                     last_modified=self.last_modified,
+                                     kwargs=kwargs)
+            if reply is not None:
+                return reply
+            if request.method == 'HEAD' and is_default_head(self):
+                return {}
+        kwargs['request'] = request
+        scope = getattr(request, 'scope', None)
+        if scope is not None:
+            kwargs = scope.inject(func, kwargs)
         try:
-            return func(request=request, **kwargs)
+            return func(**kwargs)
         except NotImplementedError:
             return None
 
@@ -420,6 +1622,527 @@ class Httpish(object):
     def trace(self, request, **kwargs): raise NotImplementedError
 
 
+class ErrorLog(object):
+    """
+    Counts errors by name, and logs tracebacks for them at a limited rate:
+    only the first `burst` of each name within every `interval` seconds are
+    logged in full, so a flood of the same failure doesn't turn into a flood
+    of traceback formatting.
+
+    Counting doesn't take `lock` (so that a flood of 404s doesn't contend on
+    it): each thread counts into its own dictionary, and `counts` adds them
+    up when asked.
+    """
+    __slots__ = ('logger', 'interval', 'burst', 'shards', 'local',
+                 'suppressed', 'windows', 'lock')
+
+    def __init__(self, logger, interval=60.0, burst=10):
+        self.logger = logger
+        self.interval = interval
+        self.burst = burst
+        self.shards = ()
+        self.local = threading.local()
+        self.suppressed = 0
+        self.windows = {}
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return '<blanket.ErrorLog counts={counts!r}, suppressed={n!r}>'.format(
+            counts=self.counts, n=self.suppressed)
+
+    @property
+    def counts(self):
+        totals = {}
+        for shard in self.shards:
+            for name, count in list(shard.items()):
+                totals[name] = totals.get(name, 0) + count
+        return totals
+
+    def count(self, name):
+        try:
+            shard = self.local.counts
+        except AttributeError:
+            # once per thread.
+            shard = self.local.counts = {}
+            with self.lock:
+                self.shards = self.shards + (shard,)
+        shard[name] = shard.get(name, 0) + 1
+
+    def __call__(self, name, msg, extra=None):
+        """
+        Must be called from within an `except` block, as the traceback is
+        taken from there.
+        """
+        self.count(name=name)
+        now = time.time()
+        with self.lock:
+            started, seen = self.windows.get(name, (now, 0))
+            if now - started >= self.interval:
+                started, seen = now, 0
+            seen += 1
+            self.windows[name] = (started, seen)
+            if seen > self.burst:
+                self.suppressed += 1
+        if seen <= self.burst:
+            self.logger.error(msg, exc_info=1, extra=extra)
+        elif seen == self.burst + 1:
+            self.logger.warning("Suppressing further `{name!s}` tracebacks "
+                                "for up to {interval!s} seconds".format(
+                name=name, interval=self.interval))
+
+
+def parse_header_params(value):
+    """
+    Split a header like `Content-Disposition` into its main value and a
+    dictionary of its `; key=value` parameters.
+    """
+    main = value.split(';', 1)[0].strip().lower()
+    params = {}
+    pattern = r';\s*([^=;\s]+)\s*=\s*("(?:[^"\\]|\\.)*"|[^;]*)'
+    for key, param in re.findall(pattern, value):
+        param = param.strip()
+        if param.startswith('"') and param.endswith('"'):
+            param = re.sub(r'\\(.)', r'\1', param[1:-1])
+        params[key.lower()] = param
+    return main, params
+
+
+def next_chunk(chunks):
+    chunk = next(chunks, None)
+    if chunk is None:
+        raise BlanketValueError("Request body ended part way through a "
+                                "multipart message")
+    return chunk
+
+
+class BodyPart(namedtuple('BodyPart', 'headers name filename content_type '
+                                      'file')):
+    """
+    One part of a multipart request body, with its content in `file` (which
+    is rewound, and only on disk if it was larger than the spool threshold).
+    """
+    __slots__ = ()
+
+
+class ValueEnd(object):
+    """
+    Finds where a JSON value ends, from text given in pieces, by tracking
+    nesting and strings; each character is looked at once, so a value
+    arriving over many chunks isn't re-parsed for every one of them.
+
+    `feed` gives the index in `text` just past the end of a container or
+    string, or the index of whatever ends any other value (whitespace, `,`,
+    `]` or `}`), or `None` if the value continues beyond `text`.
+    """
+    __slots__ = ('depth', 'quoted', 'escaped')
+    def __init__(self):
+        self.depth = 0
+        self.quoted = False
+        self.escaped = False
+
+    def feed(self, text, start=0):
+        for index in range(start, len(text)):
+            char = text[index]
+            if self.quoted:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.quoted = False
+                    if self.depth == 0:
+                        return index + 1
+            elif char == '"':
+                self.quoted = True
+            elif char in '[{':
+                self.depth += 1
+            elif char in ']}':
+                if self.depth == 0:
+                    return index
+                self.depth -= 1
+                if self.depth == 0:
+                    return index + 1
+            elif self.depth == 0 and char in ' \t\r\n,':
+                return index
+        return None
+
+
+class BodyReader(object):
+    """
+    Incremental access to the request body straight from `wsgi.input`,
+    available to handlers as `request.body_reader`, so that large uploads
+    needn't be buffered in memory the way `request.body` and `request.POST`
+    are.
+
+    At most `limit` bytes will be read (if it's set); going over raises
+    `RequestTooLarge` part way through, as it happens.
+    """
+    __slots__ = ('input', 'remaining', 'terminated', 'content_type', 'limit',
+                 'chunk_size', 'spool_threshold', 'consumed')
+    header_limit = 16384
+
+    def __init__(self, environ, limit=None, chunk_size=65536,
+                 spool_threshold=1048576):
+        self.input = environ.get('wsgi.input')
+        try:
+            self.remaining = int(environ.get('CONTENT_LENGTH') or '')
+        except ValueError:
+            self.remaining = None
+        self.terminated = bool(environ.get('wsgi.input_terminated'))
+        self.content_type = environ.get('CONTENT_TYPE', '')
+        self.limit = limit
+        self.chunk_size = chunk_size
+        self.spool_threshold = spool_threshold
+        self.consumed = 0
+
+    def __repr__(self):
+        return ('<blanket.BodyReader consumed={consumed!r}, '
+                'remaining={remaining!r}, limit={limit!r}>'.format(
+            consumed=self.consumed, remaining=self.remaining,
+            limit=self.limit))
+
+    def too_large(self):
+        return RequestTooLarge("Request body is larger than the {limit!s} "
+                               "bytes allowed".format(limit=self.limit))
+
+    def chunks(self, size=None):
+        """
+        Yield the raw body as bytes, in pieces of at most `size`.
+        """
+        size = size or self.chunk_size
+        if self.limit is not None and (self.remaining or 0) > self.limit:
+            raise self.too_large()
+        while self.input is not None:
+            if self.remaining is None:
+                # without a length, only read if the server promises EOF
+                if not self.terminated:
+                    return
+                wanted = size
+            elif self.remaining > 0:
+                wanted = min(size, self.remaining)
+            else:
+                return
+            chunk = self.input.read(wanted)
+            if not chunk:
+                return
+            if self.remaining is not None:
+                self.remaining -= len(chunk)
+            self.consumed += len(chunk)
+            if self.limit is not None and self.consumed > self.limit:
+                raise self.too_large()
+            yield chunk
+
+    def text(self, encoding='utf-8'):
+        import codecs
+        decoder = codecs.getincrementaldecoder(encoding)()
+        for chunk in self.chunks():
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+        text = decoder.decode(b'', True)
+        if text:
+            yield text
+
+    def ndjson(self):
+        """
+        Yield each value of a newline delimited JSON body.
+        """
+        import json
+        pending = ''
+        for text in self.text():
+            lines = (pending + text).split('\n')
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if pending.strip():
+            yield json.loads(pending)
+
+    def json_array(self):
+        """
+        Yield each item of a body which is a single JSON array, without
+        holding more than the item being decoded in memory.
+        """
+        import json
+        parser = json.JSONDecoder()
+        texts = self.text()
+        buffer, position, state, eof = '', 0, 'start', False
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n':
+                position += 1
+            if position < len(buffer):
+                char = buffer[position]
+                if state == 'start':
+                    if char != '[':
+                        raise BlanketValueError("Request body is not a JSON "
+                                                "array")
+                    position, state = position + 1, 'first'
+                    continue
+                if state == 'separator' or (state == 'first' and char == ']'):
+                    if char == ']':
+                        return
+                    if char != ',':
+                        raise BlanketValueError("Expected `,` or `]` in the "
+                                                "JSON array, got `{char!s}`"
+                                                "".format(char=char))
+                    position, state = position + 1, 'value'
+                    continue
+                # only decode once the value's end has arrived; the text after
+                # it is collected, rather than re-joined for every chunk.
+                scanner = ValueEnd()
+                pieces = [buffer[position:]]
+                end = scanner.feed(pieces[0])
+                offset = 0
+                while end is None and not eof:
+                    text = next(texts, None)
+                    if text is None:
+                        eof = True
+                        continue
+                    offset += len(pieces[-1])
+                    pieces.append(text)
+                    end = scanner.feed(text)
+                    if end is not None:
+                        end += offset
+                buffer, position = ''.join(pieces), 0
+                if end is None:
+                    end = len(buffer)
+                try:
+                    value, stop = parser.raw_decode(buffer, 0)
+                except ValueError:
+                    stop = None
+                if stop != end:
+                    raise BlanketValueError("Request body has an invalid "
+                                            "item in its JSON array")
+                yield value
+                position, state = end, 'separator'
+                continue
+            if eof:
+                raise BlanketValueError("Request body ended part way through "
+                                        "a JSON array")
+            text = next(texts, None)
+            if text is None:
+                eof = True
+            else:
+                buffer, position = buffer[position:] + text, 0
+
+    def multipart(self):
+        """
+        Yield each `BodyPart` of a `multipart/*` body in turn, spooling its
+        content to a temporary file once it grows beyond the spool threshold.
+        """
+        import tempfile
+        main, params = parse_header_params(self.content_type)
+        if not main.startswith('multipart/') or not params.get('boundary'):
+            raise BlanketValueError("Request body is not multipart, or has "
+                                    "no boundary")
+        delimiter = b'\r\n--' + params['boundary'].encode('latin-1')
+        keep = len(delimiter) - 1
+        chunks = self.chunks()
+        # the first boundary needn't follow a CRLF, but pretending it did
+        # means it can be found like every other.
+        buffer = b'\r\n'
+        while delimiter not in buffer:
+            buffer = buffer[-keep:] + next_chunk(chunks)
+        buffer = buffer[buffer.index(delimiter) + len(delimiter):]
+
+        while True:
+            while len(buffer) < 2:
+                buffer += next_chunk(chunks)
+            if buffer[:2] == b'--':
+                return
+            while b'\r\n' not in buffer:
+                buffer += next_chunk(chunks)
+            buffer = buffer[buffer.index(b'\r\n') + 2:]
+
+            while not buffer.startswith(b'\r\n') and b'\r\n\r\n' not in buffer:
+                if len(buffer) > self.header_limit:
+                    raise BlanketValueError("Multipart headers are too long")
+                buffer += next_chunk(chunks)
+            if buffer.startswith(b'\r\n'):
+                raw_headers, buffer = b'', buffer[2:]
+            else:
+                end = buffer.index(b'\r\n\r\n')
+                raw_headers, buffer = buffer[:end], buffer[end + 4:]
+            headers = {}
+            for line in raw_headers.decode('utf-8', 'replace').split('\r\n'):
+                name, _, value = line.partition(':')
+                headers[name.strip().lower()] = value.strip()
+            _, disposition = parse_header_params(
+                headers.get('content-disposition', ''))
+
+            spool = tempfile.SpooledTemporaryFile(
+                max_size=self.spool_threshold)
+            while delimiter not in buffer:
+                if len(buffer) > keep:
+                    spool.write(buffer[:-keep])
+                    buffer = buffer[-keep:]
+                buffer += next_chunk(chunks)
+            end = buffer.index(delimiter)
+            spool.write(buffer[:end])
+            buffer = buffer[end + len(delimiter):]
+            spool.seek(0)
+            yield BodyPart(headers=headers, name=disposition.get('name'),
+                           filename=disposition.get('filename'),
+                           content_type=headers.get('content-type',
+                                                    'text/plain'),
+                           file=spool)
+
+
+class Profiler(object):
+    """
+    A statistical profiler for a sampled fraction (`rate`) of requests: while
+    one of them is being handled, a background thread looks at its stack
+    every `interval` seconds, and counts it against the route which the
+    request matched.
+
+    Nothing is traced, so the cost to a request that's being watched is
+    close to nothing, and to one that isn't, a call to `random.random`.
+    """
+    __slots__ = ('rate', 'interval', 'max_depth', 'watched', 'stacks',
+                 'samples', 'sampler', 'stopped', 'lock', 'random')
+
+    def __init__(self, rate=0.01, interval=0.005, max_depth=64):
+        self.rate = rate
+        self.interval = interval
+        self.max_depth = max_depth
+        self.watched = {}
+        self.stacks = {}
+        self.samples = 0
+        self.sampler = None
+        self.stopped = threading.Event()
+        self.lock = threading.Lock()
+        # deferred until a profiler is wanted, as it drags in hashlib.
+        from random import random
+        self.random = random
+
+    def __repr__(self):
+        return ('<blanket.Profiler rate={rate!r}, samples={samples!r}, '
+                'routes={routes!r}>'.format(rate=self.rate,
+                                            samples=self.samples,
+                                            routes=len(self.stacks)))
+
+    def sample(self):
+        return self.random() < self.rate
+
+    def watch(self, request):
+        if self.sampler is None:
+            self.start()
+        self.watched[threading.current_thread().ident] = request
+
+    def unwatch(self):
+        self.watched.pop(threading.current_thread().ident, None)
+
+    def start(self):
+        with self.lock:
+            if self.sampler is None:
+                self.stopped.clear()
+                self.sampler = threading.Thread(target=self.run,
+                                                name='blanket.Profiler')
+                self.sampler.daemon = True
+                self.sampler.start()
+
+    def stop(self):
+        with self.lock:
+            sampler, self.sampler = self.sampler, None
+        if sampler is not None:
+            self.stopped.set()
+            sampler.join()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.take()
+
+    def take(self):
+        """
+        Record the current stack of every request being watched.
+        """
+        if not self.watched:
+            return
+        frames = sys._current_frames()
+        for ident, request in list(self.watched.items()):
+            frame = frames.get(ident)
+            if frame is None:
+                continue
+            route = getattr(request, 'route', None)
+            key = route.pattern.raw if route is not None else '<routing>'
+            names = []
+            while frame is not None and len(names) < self.max_depth:
+                code = frame.f_code
+                names.append('{name!s} ({file!s}:{line!s})'.format(
+                    name=code.co_name, line=code.co_firstlineno,
+                    file=os.path.basename(code.co_filename)))
+                frame = frame.f_back
+            stack = ';'.join(reversed(names))
+            with self.lock:
+                counts = self.stacks.setdefault(key, {})
+                counts[stack] = counts.get(stack, 0) + 1
+                self.samples += 1
+
+    def collapsed(self, route=None):
+        """
+        The samples taken so far in the "collapsed stack" format that
+        flamegraph tools expect, with each route as the root frame; or only
+        those for `route`, if it's given.
+        """
+        lines = []
+        with self.lock:
+            stacks = [(key, sorted(counts.items()))
+                      for key, counts in sorted(self.stacks.items())
+                      if route is None or key == route]
+        for key, counts in stacks:
+            for stack, count in counts:
+                lines.append('{key!s};{stack!s} {count!s}'.format(
+                    key=key, stack=stack, count=count))
+        return '\n'.join(lines)
+
+    def dump(self, path, route=None):
+        with open(path, 'w') as output:
+            output.write(self.collapsed(route=route))
+
+    def reset(self):
+        with self.lock:
+            self.stacks = {}
+            self.samples = 0
+
+
+def profile_report(request):
+    """
+    A handler which may be mounted (ie: at `/_profile/`) to fetch the
+    application's collapsed stacks; pass `?route=...` to only see one.
+    """
+    profiler = request.blanket.profiler
+    if profiler is None:
+        return b''
+    return profiler.collapsed(route=request.GET.get('route')).encode('utf-8')
+
+
+class LocalRequest(object):
+    """
+    A stand-in for `webob.Request` used by `Blanket.dispatch_many`, carrying
+    only what's needed to route and run a handler in-process, so there's no
+    `environ` to build or parse.
+    """
+    __slots__ = ('method', 'path', 'params', 'GET', 'POST', 'blanket',
+                 'scope', 'route', 'deadline', 'validators')
+    def __init__(self, method, path, params=None, blanket=None, deadline=None):
+        self.method = method.upper()
+        self.path = path
+        self.params = params or {}
+        if self.method in ('POST', 'PUT', 'PATCH'):
+            self.GET, self.POST = {}, self.params
+        else:
+            self.GET, self.POST = self.params, {}
+        self.blanket = blanket
+        self.scope = None
+        self.route = None
+        self.deadline = deadline
+        self.validators = None
+
+    def __repr__(self):
+        return '<blanket.LocalRequest {method!s} {path!s}>'.format(
+            method=self.method, path=self.path)
+
+
 class Blanket(object):
     """
     A blanket, generic approach to Doing Web Stuff that doesn't require
@@ -427,20 +2150,69 @@ class Blanket(object):
     that kind of jazz.
 
     Your context is your response.
+
+    Routing and running a handler never takes a lock: the routers' tables
+    are append-only (see `Router`) and `providers` is replaced wholesale
+    rather than mutated, so a request sees each route or provider either
+    fully added or not at all. Adding routes or providers while serving is
+    therefore safe, and writers are serialized against each other.
+
+    The opt-in features which share state between requests do take short
+    locks of their own: a `Limiter` (`max_concurrency`), the `Compressor`'s
+    cache (`compression`, ie: `{}` for the defaults) and the `ErrorLog` when
+    it logs a traceback.
     """
     __slots__ = (
+        'compressor',
         'configuration',
         'error_router',
+        'errors',
+        'hosts',
+        'limiter',
+        'lock',
+        'middleware',
+        'pipeline',
+        'profiler',
+        'providers',
         'router',
     )
 
     def __init__(self, configuration=None):
         self.configuration = configuration or {}
+        compression = self.configuration.get('compression')
+        if compression is not None:
+            self.compressor = Compressor(**compression)
+        else:
+            self.compressor = None
         self.error_router = ErrorRouter(application=self)
-        self.router = Router(application=self)
+        self.errors = ErrorLog(logger=self.log,
+                               **self.configuration.get('error_log', {}))
+        if self.configuration.get('max_concurrency') is not None:
+            self.limiter = Limiter(
+                limit=self.configuration['max_concurrency'],
+                queue_timeout=self.configuration.get('queue_timeout', 0),
+                retry_after=self.configuration.get('retry_after', 1))
+        else:
+            self.limiter = None
+        self.lock = threading.Lock()
+        self.middleware = ()
+        self.pipeline = None
+        if self.configuration.get('profile_rate'):
+            self.profiler = Profiler(
+                rate=self.configuration['profile_rate'],
+                interval=self.configuration.get('profile_interval', 0.005))
+        else:
+            self.profiler = None
+        self.providers = {}
+        if self.configuration.get('compact_routes'):
+            self.router = CompactRouter(application=self)
+        else:
+            self.router = Router(application=self)
+        self.hosts = HostRouter(application=self,
+                                router_class=self.router.__class__)
 
     def __len__(self):
-        return len(self.router) + len(self.error_router)
+        return len(self.router) + len(self.hosts) + len(self.error_router)
 
     def __nonzero__(self):
         return bool(len(self))
@@ -474,7 +2246,21 @@ class Blanket(object):
         name = get_name_from_obj(obj=self)
         return logging.getLogger(name)
 
-    def add(self, handler, outputs, path=None, exception_class=None):
+    def add(self, handler, outputs, path=None, exception_class=None,
+            max_concurrency=None, queue_timeout=0, retry_after=1,
+            deadline=None, host=None):
+        """
+        Mount `handler` at either a `path` or an `exception_class`.
+
+        Routes for a `path` may set `max_concurrency` to limit how many
+        requests they handle at once; see `Limiter`. They may also set a
+        `deadline`, in seconds, within which the handler must finish; see
+        `Deadline`.
+
+        Routes mounted for a `host` are only used for requests to that host,
+        which may have a wildcard or captures; see `HostRouter`. Requests to
+        any other host use the routes without one.
+        """
         if path is None and exception_class is None:
             raise BlanketValueError("Must provide either a `path` or an "
                                     "`exception_class` parameter to mount "
@@ -482,8 +2268,32 @@ class Blanket(object):
         elif path is not None and exception_class is not None:
             raise BlanketValueError("Cannot pass both `path` and "
                                     "`exception_class` ... at least for now")
+        elif exception_class is not None and max_concurrency is not None:
+            raise BlanketValueError("Concurrency limits only apply to routes "
+                                    "mounted at a `path`")
+        elif exception_class is not None and deadline is not None:
+            raise BlanketValueError("Deadlines only apply to routes mounted "
+                                    "at a `path`")
+        elif exception_class is not None and host is not None:
+            raise BlanketValueError("Hosts only apply to routes mounted at a "
+                                    "`path`")
+        elif deadline is not None and deadline <= 0:
+            raise BlanketValueError("A deadline must be a positive number of "
+                                    "seconds, not {deadline!r}".format(
+                deadline=deadline))
         if path is not None:
-            self.router.add(thing=path, handler=handler, outputs=outputs)
+            limiter = None
+            if max_concurrency is not None:
+                limiter = Limiter(limit=max_concurrency,
+                                  queue_timeout=queue_timeout,
+                                  retry_after=retry_after)
+            if host is not None:
+                self.hosts.add(host=host, thing=path, handler=handler,
+                               outputs=outputs, limiter=limiter,
+                               deadline=deadline)
+            else:
+                self.router.add(thing=path, handler=handler, outputs=outputs,
+                                limiter=limiter, deadline=deadline)
         elif exception_class is not None:
             self.error_router.add(thing=exception_class,
                                   handler=handler, outputs=outputs)
@@ -492,35 +2302,440 @@ class Blanket(object):
                                     "add this handler given those parameters.")
 
 
+    def provide(self, name, provider):
+        """
+        Register a request-scoped provider; any handler (or other provider)
+        taking an argument called `name` will be given the value it
+        produces, computed at most once per request.
+
+        Providers should be registered before the routes which use them, so
+        that the argument isn't mistaken for one missing from the path.
+        """
+        with self.lock:
+            if name in self.providers:
+                raise BlanketValueError("A provider for `{name!s}` has "
+                                        "already been registered".format(
+                    name=name))
+            providers = dict(self.providers)
+            providers[name] = provider
+            self.providers = providers
+
+    def use(self, middleware):
+        """
+        Add a middleware, which will be called as
+        `middleware(request, call_next)` and should return a context, either
+        its own (to stop before routing happens) or whatever
+        `call_next(request)` gives back.
+
+        Middlewares run in the order they were added, sharing the one
+        `request`, and are composed into a single callable by `freeze` so
+        that each costs a single extra call per request.
+
+        A context returned before routing has no route to take `outputs`
+        from, so it's rendered with the `default_outputs` configuration
+        option, which is `JSON` unless given.
+        """
+        with self.lock:
+            self.middleware = self.middleware + (middleware,)
+            self.pipeline = None
+
+    def freeze(self):
+        with self.lock:
+            pipeline = self.dispatch
+            for middleware in reversed(self.middleware):
+                pipeline = partial(middleware, call_next=pipeline)
+            self.pipeline = pipeline
+        return pipeline
+
+    def save_routes(self, path):
+        """
+        Write the compiled route table to `path`, for `load_routes` to pick up
+        on the next cold start.
+        """
+        import json
+        with open(path, 'w') as snapshot:
+            json.dump(self.router.dump(), snapshot)
+
+    def load_routes(self, path):
+        """
+        Must be called before any routes are added. Returns whether a usable
+        snapshot was found; a missing or unreadable file just means routes
+        get prepared the slow way.
+        """
+        if not os.path.isfile(path):
+            self.log.debug("No route snapshot at `{path!s}`".format(path=path))
+            return False
+        import json
+        try:
+            with open(path, 'r') as snapshot:
+                self.router.restore(json.load(snapshot))
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            self.log.warning("Unable to load the route snapshot "
+                             "from `{path!s}`".format(path=path), exc_info=1)
+            return False
+        return True
+
     def get_response(self, environ):
+        request, context = self.handle(environ=environ)
+        return context
+
+    def handle(self, environ):
+        """
+        Route and run the handler for `environ`, returning the `Request`
+        instance (if one could be made) along with the context produced.
+
+        When the application is at its `max_concurrency`, nothing is built
+        or run and the 503 reply comes straight back.
+
+        The application's `deadline` (if configured) starts here, so time
+        spent waiting to be admitted counts against it, and ends here, before
+        anything is rendered.
+        """
+        deadline = self.make_deadline()
+        if self.limiter is None:
+            request, context = self.handle_admitted(environ=environ,
+                                                    deadline=deadline)
+        elif not self.limiter.acquire(deadline=deadline):
+            return None, self.limiter.reply
+        else:
+            try:
+                request, context = self.handle_admitted(environ=environ,
+                                                        deadline=deadline)
+            finally:
+                self.limiter.release()
+        # the handler is done with; rendering isn't held to the deadline.
+        if getattr(request, 'deadline', None) is not None:
+            request.deadline = None
+        return request, context
+
+    def make_deadline(self):
+        budget = self.configuration.get('deadline')
+        if budget is None:
+            return None
+        return Deadline(budget=budget)
+
+    def timed_out(self, exception, request):
+        """
+        Expired requests go to the error router if it has been asked to
+        handle `DeadlineExceeded`, or get the preallocated 504 otherwise.
+        """
+        self.errors.count(name='DeadlineExceeded')
+        if not self.error_router.catches(exception_class=DeadlineExceeded):
+            return TIMED_OUT
+        return self.error_router(exception=exception, request=request)
+
+    def admission_stats(self):
+        """
+        In-flight, admitted and rejected counts for the application (under
+        `None`) and each route with a concurrency limit (under its path).
+        """
+        stats = {path: limiter.stats()
+                 for path, limiter in self.router.limiters()}
+        for host, router in self.hosts:
+            stats.update(('{host!s}{path!s}'.format(host=host, path=path),
+                          limiter.stats())
+                         for path, limiter in router.limiters())
+        if self.limiter is not None:
+            stats[None] = self.limiter.stats()
+        return stats
+
+    def handle_admitted(self, environ, deadline=None):
+        request = None
         try:
-            if len(self.router) < 1:
+            if len(self.router) < 1 and not self.hosts:
                 raise NoRouteHandler("No routes are defined")
         except NoRouteHandler as exc:
-            self.log.error(str(exc), exc_info=1)
-            return self.error_router(exception=exc)
+            self.errors(name='NoRouteHandler', msg=str(exc))
+            return request, self.error_router(exception=exc)
 
         try:
+            from webob import Request
             request = Request(environ=environ, charset='utf-8')
+            request.blanket = self
+            request.deadline = deadline
+            request.scope = RequestScope(providers=self.providers,
+                                         request=request)
+            request.body_reader = BodyReader(
+                environ=environ,
+                limit=self.configuration.get('max_body_size'),
+                chunk_size=self.configuration.get('body_chunk_size', 65536),
+                spool_threshold=self.configuration.get('spool_threshold',
+                                                       1048576))
             # MIMEAccept/NilAccept don't implement len() :(
             if not request.accept:
                 raise BlanketValueError("It's a crazy world, but I won't be "
                                         "able to respond without an "
                                         "`HTTP_ACCEPT` header")
         except Exception as exc:  # nocover
-            self.log.error(msg="Unable to create a `Request` instance with "
-                               "the given `environ`", exc_info=1)
-            return self.error_router(exception=exc)
+            self.errors(name=exc.__class__.__name__,
+                        msg="Unable to create a `Request` instance with "
+                            "the given `environ`")
+            return request, self.error_router(exception=exc)
 
         # we made the request OK
+        pipeline = self.pipeline or self.freeze()
+        try:
+            return request, pipeline(request)
+        except RequestTooLarge as exc:
+            self.errors.count(name='RequestTooLarge')
+            if not self.error_router.catches(exception_class=RequestTooLarge):
+                return request, TOO_LARGE
+            return request, self.error_router(exception=exc, request=request)
+        except DeadlineExceeded as exc:
+            return request, self.timed_out(exception=exc, request=request)
+        except Exception as exc:
+            self.errors(name=exc.__class__.__name__,
+                        msg="Unable to get the view handler for this "
+                            "`request` instance safely.",
+                        extra={'request': request})
+            return request, self.error_router(exception=exc, request=request)
+
+    def dispatch(self, request):
+        """
+        The innermost step of the pipeline, which routes the `request` and
+        runs the handler found, under the `profiler` if this request has been
+        chosen for sampling.
+        """
+        router, captures = self.select_router(request=request)
+        profiler = self.profiler
+        if profiler is not None and profiler.sample():
+            profiler.watch(request=request)
+            try:
+                context = router.find(request=request, captures=captures)
+            finally:
+                profiler.unwatch()
+        else:
+            context = router.find(request=request, captures=captures)
+        if context is None:
+            return self.not_found(request=request, router=router)
+        return context
+
+    def select_router(self, request):
+        """
+        The `Router` for the host `request` was made to, along with anything
+        captured from the host, falling back to the routes without a host.
+        """
+        if self.hosts:
+            router, captures = self.hosts.select(host=request.host)
+            if router is not None:
+                return router, captures
+        return self.router, None
+
+    def not_found(self, request, router=None):
+        """
+        The fast path for a routing miss: unless there's an error handler
+        wanting to deal with `NoRouteHandler`, hand back the preallocated
+        `NOT_FOUND` reply without raising or logging anything.
+        """
+        self.errors.count(name='NotFound')
+        if self.error_router.catches(exception_class=NoRouteHandler):
+            if router is None:
+                router = self.router
+            return self.error_router(
+                exception=router.no_route(path=request.path),
+                request=request)
+        return NOT_FOUND
+
+    def render(self, request, context, recover=True):
+        """
+        Turn a context into a `Response` using the best `Output` of the route
+        which produced it, then compress it if the client allows.
+
+        Contexts which are already bytes (or an iterator of them) are sent
+        as they are. Responses to HEAD requests skip the `Output` entirely.
+        Contexts which didn't come from a route (ie: from a middleware) use
+        the `default_outputs` configuration option, and if there's no
+        `request` at all (it couldn't be made) the first of those is used.
+
+        If the `Output` raises, see `render_failed`; unless `recover` is
+        false, which is how that renders the error handler's context.
+        """
+        if isinstance(context, Reply):
+            return context
+        from webob import Response
+        head = request is not None and request.method == 'HEAD'
+        content_type = None
+        body = b''
+        if isinstance(context, bytes) or is_iterator(context):
+            body = context
+        else:
+            route = getattr(request, 'route', None)
+            if route is not None:
+                outputs = route.outputs
+            else:
+                outputs = self.configuration.get('default_outputs', (JSON,))
+            offers = [mimetype for output in outputs
+                      for mimetype in output.responds_to]
+            if request is None:
+                content_type = offers and offers[0]
+            else:
+                content_type = offers and request.accept.best_match(offers)
+            if not content_type:
+                return Response(status=406)
+            if not head:
+                output = next(output for output in outputs
+                              if content_type in output)
+                try:
+                    body = output(request=request, context=context)
+                except Exception as exc:
+                    if not recover:
+                        self.errors(name=exc.__class__.__name__,
+                                    msg="Unable to render an error handler's "
+                                        "context safely.",
+                                    extra={'request': request})
+                        return SERVER_ERROR
+                    return self.render_failed(request=request, exception=exc)
+                if body is None:
+                    return Response(status=500)
+                if isinstance(body, text_type):
+                    body = body.encode('utf-8')
+
+        encoding = None
+        if head:
+            response = Response(app_iter=[])
+            response.content_length = None
+        else:
+            if self.compressor is not None and request is not None:
+                encoding, body = self.compressor(request=request, body=body)
+            if isinstance(body, bytes):
+                response = Response(body=body)
+            else:
+                response = Response(app_iter=body)
+        tag, modified = getattr(request, 'validators', None) or (None, None)
+        if tag is not None:
+            response.etag = tag
+        if modified is not None:
+            response.last_modified = modified
+        if content_type is not None:
+            response.content_type = content_type
+        if self.compressor is not None:
+            response.vary = ('Accept-Encoding',)
+        if encoding is not None:
+            response.content_encoding = encoding
+        return response
+
+    def render_failed(self, request, exception):
+        """
+        An `Output` raised, so the error router gets a chance to handle it,
+        as if the handler had. If it can't, or rendering what it gives back
+        fails as well, it's the preallocated 500.
+        """
+        self.errors(name=exception.__class__.__name__,
+                    msg="Unable to render the context for this `request` "
+                        "instance safely.", extra={'request': request})
+        if isinstance(getattr(request, 'route', None), ErrorRoute):
+            return SERVER_ERROR
+        if not self.error_router.catches(exception_class=exception.__class__):
+            return SERVER_ERROR
+        try:
+            context = self.error_router(exception=exception, request=request)
+        except Exception:
+            self.errors(name='NoErrorHandler',
+                        msg="Unable to handle an exception raised while "
+                            "rendering", extra={'request': request})
+            return SERVER_ERROR
+        return self.render(request=request, context=context, recover=False)
+
+    def dispatch_many(self, calls, threads=None, deadline=None):
+        """
+        Run a batch of `(method, path, params)` calls in-process, returning
+        their contexts in the same order; there's no WSGI `environ` and no
+        `webob` involved at all.
+
+        Each distinct path is only matched against the routes once per batch.
+        If `threads` is given, the handlers are run concurrently on that
+        many threads. Middleware (see `use`) is not applied, and only the
+        routes without a `host` are used. Each call counts against the
+        application's `max_concurrency`, so a batch made from within a
+        request may need it to allow for more than one at a time.
+
+        The whole batch shares one `deadline` (a `Deadline`, defaulting to
+        the application's); when running on threads, any call still going
+        once it passes is given up on, and its context is the timeout.
+        """
+        if deadline is None:
+            deadline = self.make_deadline()
+        resolved = {}
+        requests = []
+        for method, path, params in calls:
+            if path not in resolved:
+                resolved[path] = tuple(self.router.matches(path=path))
+            request = LocalRequest(method=method, path=path, params=params,
+                                   blanket=self, deadline=deadline)
+            request.scope = RequestScope(providers=self.providers,
+                                         request=request)
+            requests.append((request, resolved[path]))
+
+        if threads is None:
+            return [self.dispatch_one(request, candidates)
+                    for request, candidates in requests]
+
+        from multiprocessing.pool import ThreadPool
+        pool = ThreadPool(processes=threads)
+        if deadline is None:
+            try:
+                return pool.map(lambda job: self.dispatch_one(*job), requests)
+            finally:
+                pool.close()
+                pool.join()
+
+        from multiprocessing import TimeoutError
+        pending = [pool.apply_async(self.dispatch_one, job)
+                   for job in requests]
+        pool.close()
+        contexts = []
+        for (request, _), result in zip(requests, pending):
+            try:
+                contexts.append(result.get(timeout=deadline.remaining()))
+            except TimeoutError:
+                # the handler can't be stopped, but it will stop itself at
+                # its next `keepcalling` step; its worker isn't waited for,
+                # and keeps its own `request` (and deadline) to do so.
+                stand_in = LocalRequest(method=request.method,
+                                        path=request.path,
+                                        params=request.params, blanket=self)
+                stand_in.scope = RequestScope(providers=self.providers,
+                                              request=stand_in)
+                contexts.append(self.timed_out(
+                    exception=DeadlineExceeded("Deadline of {budget!s}s "
+                                               "exceeded".format(
+                        budget=deadline.budget)), request=stand_in))
+        if all(result.ready() for result in pending):
+            pool.join()
+        return contexts
+
+    def dispatch_one(self, request, candidates):
+        """
+        Each call in a batch is admitted like a request would be, when the
+        application has a `max_concurrency`.
+        """
+        if self.limiter is None:
+            return self.dispatch_one_admitted(request=request,
+                                              candidates=candidates)
+        if not self.limiter.acquire(deadline=request.deadline):
+            return self.limiter.reply
+        try:
+            return self.dispatch_one_admitted(request=request,
+                                              candidates=candidates)
+        finally:
+            self.limiter.release()
+
+    def dispatch_one_admitted(self, request, candidates):
         try:
-            return self.router(request=request)
+            for route, kwargs in candidates:
+                result = route.dispatch(request=request, kwargs=kwargs)
+                if result is not None:
+                    return result
+        except DeadlineExceeded as exc:
+            return self.timed_out(exception=exc, request=request)
         except Exception as exc:
-            self.log.error(msg="Unable to get the view handler for this "
-                               "`request` instance safely.", exc_info=1,
-                           extra={'request': request})
+            self.errors(name=exc.__class__.__name__,
+                        msg="Unable to dispatch {request!r} "
+                            "safely.".format(request=request))
             return self.error_router(exception=exc, request=request)
+        return self.not_found(request=request)
 
     def __call__(self, environ, start_response):
-        response_instance = Response(self.get_response(environ=environ))
+        request, context = self.handle(environ=environ)
+        response_instance = self.render(request=request, context=context)
         return response_instance(environ=environ, start_response=start_response)
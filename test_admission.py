@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import threading
+import time
+from blanket import Blanket
+from blanket import BlanketValueError
+from blanket import Deadline
+from blanket import JSON
+from blanket import Limiter
+import pytest
+from webob import Request
+
+
+def _get(app, path='/'):
+    return Request.blank(path, accept='application/json').get_response(app)
+
+
+def _blocking_app(entered, release, **configuration):
+    def slow(request):
+        entered.set()
+        release.wait(5)
+        return {'slow': True}
+    app = Blanket(configuration=configuration)
+    return app, slow
+
+
+def _in_background(app, path='/'):
+    thread = threading.Thread(target=_get, args=(app, path))
+    thread.start()
+    return thread
+
+
+def test_route_limit_rejects_with_retry_after():
+    entered, release = threading.Event(), threading.Event()
+    app, slow = _blocking_app(entered, release)
+    app.add(path='/', handler=slow, outputs=[JSON], max_concurrency=1,
+            retry_after=7)
+    app.add(path='/other/', handler=lambda request: {'ok': True},
+            outputs=[JSON])
+    thread = _in_background(app)
+    entered.wait(5)
+    rejected = _get(app)
+    assert rejected.status_int == 503
+    assert rejected.headers['Retry-After'] == '7'
+    assert _get(app, '/other/').status_int == 200
+    assert app.admission_stats() == {
+        '/': {'limit': 1, 'in_flight': 1, 'admitted': 1, 'rejected': 1}}
+    release.set()
+    thread.join()
+    assert app.admission_stats()['/']['in_flight'] == 0
+
+
+def test_app_limit_rejects_before_routing():
+    entered, release = threading.Event(), threading.Event()
+    app, slow = _blocking_app(entered, release, max_concurrency=1)
+    app.add(path='/', handler=slow, outputs=[JSON])
+    thread = _in_background(app)
+    entered.wait(5)
+    assert _get(app, '/anything/').status_int == 503
+    release.set()
+    thread.join()
+    assert app.admission_stats() == {
+        None: {'limit': 1, 'in_flight': 0, 'admitted': 1, 'rejected': 1}}
+
+
+def test_queue_timeout_admits_when_a_slot_frees():
+    limiter = Limiter(limit=1, queue_timeout=5)
+    assert limiter.acquire()
+    timer = threading.Timer(0.05, limiter.release)
+    timer.start()
+    assert limiter.acquire()
+    timer.join()
+    assert limiter.stats() == {'limit': 1, 'in_flight': 1, 'admitted': 2,
+                               'rejected': 0}
+
+
+def test_queue_timeout_expires():
+    limiter = Limiter(limit=1, queue_timeout=0.01)
+    assert limiter.acquire()
+    assert not limiter.acquire()
+    assert limiter.rejected == 1
+
+
+def test_queue_wait_is_capped_by_the_deadline():
+    limiter = Limiter(limit=1, queue_timeout=5)
+    assert limiter.acquire()
+    started = time.time()
+    assert not limiter.acquire(deadline=Deadline(budget=0.05))
+    assert time.time() - started < 1
+
+
+def test_app_limit_applies_to_dispatch_many():
+    entered, release = threading.Event(), threading.Event()
+    app, slow = _blocking_app(entered, release, max_concurrency=1)
+    app.add(path='/', handler=slow, outputs=[JSON])
+    app.add(path='/fast/', handler=lambda request: {'ok': True},
+            outputs=[JSON])
+    thread = _in_background(app)
+    entered.wait(5)
+    try:
+        result = app.dispatch_many([('GET', '/fast/', None)])
+    finally:
+        release.set()
+        thread.join()
+    assert result == [app.limiter.reply]
+    assert app.dispatch_many([('GET', '/fast/', None)]) == [{'ok': True}]
+    assert app.limiter.stats()['rejected'] == 1
+
+
+def test_invalid_limits():
+    with pytest.raises(BlanketValueError):
+        Limiter(limit=0)
+    app = Blanket()
+    with pytest.raises(BlanketValueError):
+        app.add(exception_class=ValueError, handler=lambda: None,
+                outputs=[JSON], max_concurrency=1)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import io
+import json
+from blanket import Blanket
+from blanket import BlanketValueError
+from blanket import BodyReader
+from blanket import JSON
+from blanket import RequestTooLarge
+import pytest
+from webob import Request
+
+
+def _reader(body, content_type='application/octet-stream', **kwargs):
+    environ = {'wsgi.input': io.BytesIO(body),
+               'CONTENT_LENGTH': str(len(body)),
+               'CONTENT_TYPE': content_type}
+    return BodyReader(environ=environ, **kwargs)
+
+
+def test_chunks():
+    reader = _reader(b'abcdefghij', chunk_size=4)
+    assert list(reader.chunks()) == [b'abcd', b'efgh', b'ij']
+    assert reader.consumed == 10
+
+
+def test_chunks_stop_at_content_length():
+    environ = {'wsgi.input': io.BytesIO(b'abcdef'), 'CONTENT_LENGTH': '3'}
+    assert list(BodyReader(environ=environ).chunks()) == [b'abc']
+
+
+def test_chunks_without_length():
+    environ = {'wsgi.input': io.BytesIO(b'abcdef')}
+    assert list(BodyReader(environ=environ).chunks()) == []
+    environ = {'wsgi.input': io.BytesIO(b'abcdef'),
+               'wsgi.input_terminated': True}
+    assert list(BodyReader(environ=environ).chunks()) == [b'abcdef']
+
+
+def test_limit_on_declared_length():
+    with pytest.raises(RequestTooLarge):
+        list(_reader(b'x' * 20, limit=10).chunks())
+
+
+def test_limit_while_reading():
+    environ = {'wsgi.input': io.BytesIO(b'x' * 20),
+               'wsgi.input_terminated': True}
+    reader = BodyReader(environ=environ, limit=10, chunk_size=4)
+    with pytest.raises(RequestTooLarge):
+        list(reader.chunks())
+    assert reader.consumed == 12
+
+
+def test_ndjson():
+    body = b'{"a": 1}\n\n{"b": "\xc3\xa9"}\n[3]'
+    reader = _reader(body, chunk_size=3)
+    assert list(reader.ndjson()) == [{'a': 1}, {'b': '\xe9'}, [3]]
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 7, 1024])
+def test_json_array(chunk_size):
+    items = [1, 23456, 'x, y]', {'nested': [1, 2]}, None, -0.5, True]
+    body = json.dumps(items).encode('utf-8')
+    reader = _reader(body, chunk_size=chunk_size)
+    assert list(reader.json_array()) == items
+
+
+def test_json_array_escapes_and_nesting():
+    items = ['quote " and ] and \\', {'a': ['}', {'b': '\\"'}]}, [[], {}]]
+    body = json.dumps(items).encode('utf-8')
+    assert list(_reader(body, chunk_size=3).json_array()) == items
+
+
+def test_json_array_decodes_each_item_once(monkeypatch):
+    calls = []
+    raw_decode = json.JSONDecoder.raw_decode
+    def counting(self, *args, **kwargs):
+        calls.append(args[1:])
+        return raw_decode(self, *args, **kwargs)
+    monkeypatch.setattr(json.JSONDecoder, 'raw_decode', counting)
+    items = [{'big': 'x' * 5000, 'list': list(range(500))}, 1, 'two']
+    body = json.dumps(items).encode('utf-8')
+    assert list(_reader(body, chunk_size=64).json_array()) == items
+    assert len(calls) == 3
+
+
+def test_json_array_empty():
+    assert list(_reader(b' [ ] ').json_array()) == []
+
+
+@pytest.mark.parametrize('body', [b'{"a": 1}', b'[1, 2', b'[1 2]', b'',
+                                  b'[1,', b'[tru, 1]', b'[{"a": 1]}]'])
+def test_json_array_invalid(body):
+    with pytest.raises(BlanketValueError):
+        list(_reader(body, chunk_size=2).json_array())
+
+
+def _multipart():
+    return (b'preamble\r\n'
+            b'--XyZ\r\n'
+            b'Content-Disposition: form-data; name="title"\r\n'
+            b'\r\n'
+            b'hello\r\n'
+            b'--XyZ\r\n'
+            b'Content-Disposition: form-data; name="upload"; '
+            b'filename="a;b.txt"\r\n'
+            b'Content-Type: text/csv\r\n'
+            b'\r\n' +
+            b'0123456789' * 50 + b'\r\n--XyY\r\n' +
+            b'\r\n'
+            b'--XyZ--\r\n'
+            b'epilogue')
+
+
+@pytest.mark.parametrize('chunk_size', [1, 5, 64, 4096])
+def test_multipart(chunk_size):
+    reader = _reader(_multipart(), chunk_size=chunk_size,
+                     content_type='multipart/form-data; boundary="XyZ"',
+                     spool_threshold=100)
+    parts = list(reader.multipart())
+    assert [part.name for part in parts] == ['title', 'upload']
+    assert parts[0].file.read() == b'hello'
+    assert parts[0].filename is None
+    assert parts[1].filename == 'a;b.txt'
+    assert parts[1].content_type == 'text/csv'
+    assert parts[1].file.read() == b'0123456789' * 50 + b'\r\n--XyY\r\n'
+    # over the spool threshold, so it went to disk.
+    assert parts[1].file._rolled
+
+
+def test_multipart_truncated():
+    reader = _reader(_multipart()[:-30],
+                     content_type='multipart/form-data; boundary=XyZ')
+    with pytest.raises(BlanketValueError):
+        list(reader.multipart())
+
+
+def test_not_multipart():
+    with pytest.raises(BlanketValueError):
+        list(_reader(b'', content_type='text/plain').multipart())
+
+
+def _count(request):
+    return {'count': len(list(request.body_reader.json_array()))}
+
+
+def test_available_to_handlers():
+    app = Blanket()
+    app.add(path='/', handler=_count, outputs=[JSON])
+    request = Request.blank('/', accept='application/json', method='POST',
+                            body=b'[1, 2, 3]')
+    assert app.get_response(environ=request.environ) == {'count': 3}
+
+
+def test_too_large_becomes_413():
+    app = Blanket(configuration={'max_body_size': 4})
+    app.add(path='/', handler=_count, outputs=[JSON])
+    request = Request.blank('/', accept='application/json', method='POST',
+                            body=b'[1, 2, 3]')
+    response = request.get_response(app)
+    assert response.status_int == 413
+    assert app.errors.counts == {'RequestTooLarge': 1}
@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from blanket import Blanket
+from blanket import CompactRouter
+from blanket import DuplicateRoute
+from blanket import JSON
+from blanket import Limiter
+from blanket import NoRouteHandler
+from blanket import Route
+from blanket import Router
+import pytest
+from webob import Request
+
+
+def _fake_handler(a, request=None):
+    return {'test': a}
+
+
+def _static_handler(request):
+    return {'static': request.path}
+
+
+def _declines(a, request):
+    return None
+
+
+PATHS = (
+    ('test/{a!s}/', _fake_handler),
+    ('/test/{a!d}/edit/', _fake_handler),
+    ('/tenant-1/items/{a!d}/', _fake_handler),
+    ('/tenant-2/items/{a!d}/', _fake_handler),
+    ('/About/', _static_handler),
+    ('/robots.txt', _static_handler),
+    ('/{a!slug}/', _fake_handler),
+    ('/', _static_handler),
+)
+
+
+def _both():
+    for router in (Router(), CompactRouter()):
+        for path, handler in PATHS:
+            router.add(thing=path, handler=handler, outputs=(JSON,))
+        yield router
+
+
+@pytest.mark.parametrize('path', (
+    '/', '/about/', '/ABOUT/', '/robots.txt', '/robotsXtxt', '/test/1/',
+    '/test/1/edit/', '/TENANT-2/items/4/', '/tenant-3/items/4/', '/slug/',
+    '/nope/nope/', '/tenant-1/items/x/',
+))
+def test_same_matches_as_router(path):
+    router, compact = _both()
+    expected = [(route.pattern.raw, kwargs)
+                for route, kwargs in router.matches(path=path)]
+    found = [(route.pattern.raw, kwargs)
+             for route, kwargs in compact.matches(path=path)]
+    assert found == expected
+    assert (path in compact) == (path in router)
+
+
+def test_same_listing_and_len_as_router():
+    router, compact = _both()
+    assert compact.listing() == router.listing()
+    assert len(compact) == len(router) == len(PATHS)
+    assert [route.pattern.raw for route in compact] == [
+        route.pattern.raw for route in router]
+
+
+def test_shapes_are_shared():
+    router = CompactRouter()
+    for tenant in range(100):
+        router.add(thing='/tenant-{0}/items/{{a!d}}/'.format(tenant),
+                   handler=_fake_handler, outputs=(JSON,))
+    assert len(router.routes.shape_regexes) == 1
+    assert len(set(map(id, router.routes.outputs))) == 1
+    request = Request.blank('/tenant-42/items/7/')
+    assert router(request=request) == {'test': '7'}
+    assert request.route.pattern.raw == '/tenant-42/items/{a!d}/'
+
+
+def test_routes_are_built_on_demand():
+    router = CompactRouter()
+    limiter = Limiter(limit=1)
+    router.add(thing='/a/{a!d}/', handler=_fake_handler, outputs=(JSON,),
+               limiter=limiter)
+    router.add(thing='/b/{a!d}/', handler=_fake_handler, outputs=(JSON,))
+    first, second = router.routes[0:2]
+    assert isinstance(first, Route)
+    assert first.limiter is limiter
+    assert second.limiter is None
+    assert first.handles('/a/1/').groupdict() == {'a': '1'}
+    assert first.pattern.regex.pattern == '^/a/(?P<a>[0-9]+?)/$'
+    assert router.routes.options == {0: {'limiter': limiter}}
+
+
+def test_dispatch_defers_the_pattern(monkeypatch):
+    router = CompactRouter()
+    router.add(thing='/a/{a!d}/', handler=_fake_handler, outputs=(JSON,))
+    dumped = router.dump()
+    monkeypatch.setattr('blanket.URLTransformRegistry.source',
+                        lambda self, path: pytest.fail('transformed'))
+    request = Request.blank('/a/1/')
+    assert router(request=request) == {'test': '1'}
+    assert request.route.pattern.raw == '/a/{a!d}/'
+    monkeypatch.undo()
+    assert request.route.pattern.regex.pattern == '^/a/(?P<a>[0-9]+?)/$'
+    assert router.dump() == dumped
+
+
+def test_limiters_without_building_routes(monkeypatch):
+    router = CompactRouter()
+    limiter = Limiter(limit=1)
+    router.add(thing='/a/{a!d}/', handler=_fake_handler, outputs=(JSON,))
+    router.add(thing='/b/{a!d}/', handler=_fake_handler, outputs=(JSON,),
+               limiter=limiter)
+    monkeypatch.setattr('blanket.CompactRoutes.route',
+                        lambda self, position: pytest.fail('built'))
+    assert list(router.limiters()) == [('/b/{a!d}/', limiter)]
+
+
+def test_declining_falls_through_in_order():
+    router = CompactRouter()
+    router.add(thing='/{a!s}/', handler=_declines, outputs=(JSON,))
+    router.add(thing='/x/', handler=_static_handler, outputs=(JSON,))
+    router.add(thing='/{a!d}/', handler=_fake_handler, outputs=(JSON,))
+    assert router(request=Request.blank('/x/')) == {'static': '/x/'}
+    assert router(request=Request.blank('/1/')) == {'test': '1'}
+    with pytest.raises(NoRouteHandler):
+        router(request=Request.blank('/x/y/'))
+
+
+def test_duplicate():
+    router = CompactRouter()
+    router.add(thing='/test/{a!s}/', handler=_fake_handler, outputs=(JSON,))
+    router.add(thing='test/{a!s}/', handler=_fake_handler, outputs=(JSON,))
+    with pytest.raises(DuplicateRoute):
+        router.add(thing='/test/{a!s}/', handler=_fake_handler,
+                   outputs=(JSON,))
+
+
+def test_snapshot_round_trip():
+    router = CompactRouter()
+    router.add(thing='/test/{a!d}/', handler=_fake_handler, outputs=(JSON,))
+    restored = CompactRouter()
+    restored.restore(router.dump())
+    restored.add(thing='/test/{a!d}/', handler=_fake_handler, outputs=(JSON,))
+    assert restored.snapshot is not None
+    assert restored.dump() == router.dump()
+
+
+def test_blanket_configuration():
+    app = Blanket(configuration={'compact_routes': True, 'compression': None})
+    assert isinstance(app.router, CompactRouter)
+    app.add(path='/tenant/{a!d}/', handler=_fake_handler, outputs=(JSON,),
+            max_concurrency=2)
+    response = Request.blank('/tenant/3/', accept='application/json'
+                             ).get_response(app)
+    assert response.status_int == 200
+    assert response.json == {'test': '3'}
+    assert list(app.admission_stats()) == ['/tenant/{a!d}/']
+
+
+@pytest.mark.parametrize('configuration', ({}, {'compact_routes': True}))
+def test_contains_non_paths(configuration):
+    app = Blanket(configuration=configuration)
+    app.add(path='/{a!s}/', handler=_fake_handler, outputs=(JSON,))
+    app.add(exception_class=KeyError, outputs=(JSON,),
+            handler=lambda exception, request: {})
+    with pytest.raises(TypeError):
+        ValueError in app.router
+    assert KeyError in app
+    assert ValueError not in app
+    assert '/x/' in app
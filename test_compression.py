@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import gzip
+import io
+import json
+import zlib
+from blanket import Blanket
+from blanket import Compressor
+from blanket import JSON
+from webob import Request
+
+
+def _big(request):
+    return {'items': list(range(500))}
+
+
+def _small(request):
+    return {'ok': True}
+
+
+def _streamed(request):
+    return (b'chunk ' * 100 for _ in range(10))
+
+
+def _app(**compression):
+    app = Blanket(configuration={'compression': compression})
+    app.add(path='/big/', handler=_big, outputs=[JSON])
+    app.add(path='/small/', handler=_small, outputs=[JSON])
+    app.add(path='/streamed/', handler=_streamed, outputs=[JSON])
+    return app
+
+
+def _get(app, path, encoding=None):
+    request = Request.blank(path, accept='application/json')
+    if encoding is not None:
+        request.headers['Accept-Encoding'] = encoding
+    return request.get_response(app)
+
+
+def test_negotiate():
+    compressor = Compressor(encodings=('gzip', 'deflate'))
+    assert compressor.negotiate(None) is None
+    assert compressor.negotiate('identity') is None
+    assert compressor.negotiate('deflate, gzip') == 'gzip'
+    assert compressor.negotiate('gzip;q=0.5, deflate') == 'deflate'
+    assert compressor.negotiate('gzip;q=0, *') == 'deflate'
+    assert compressor.negotiate('*;q=0') is None
+
+
+def test_gzip():
+    response = _get(_app(), '/big/', encoding='gzip')
+    assert response.content_encoding == 'gzip'
+    assert response.content_type == 'application/json'
+    assert 'Accept-Encoding' in response.vary
+    body = gzip.GzipFile(fileobj=io.BytesIO(response.body)).read()
+    assert json.loads(body.decode('utf-8')) == {'items': list(range(500))}
+
+
+def test_deflate():
+    response = _get(_app(encodings=('deflate',)), '/big/',
+                    encoding='gzip, deflate')
+    assert response.content_encoding == 'deflate'
+    assert json.loads(zlib.decompress(response.body).decode('utf-8'))
+
+
+def test_not_accepted():
+    response = _get(_app(), '/big/')
+    assert response.content_encoding is None
+    assert json.loads(response.body.decode('utf-8'))
+
+
+def test_below_threshold():
+    response = _get(_app(), '/small/', encoding='gzip')
+    assert response.content_encoding is None
+
+
+def test_streaming():
+    response = _get(_app(), '/streamed/', encoding='gzip')
+    assert response.content_encoding == 'gzip'
+    body = gzip.GzipFile(fileobj=io.BytesIO(response.body)).read()
+    assert body == b'chunk ' * 1000
+
+
+def test_precompressed_cache():
+    app = _app()
+    first = _get(app, '/big/', encoding='gzip')
+    assert len(app.compressor.cache) == 1
+    second = _get(app, '/big/', encoding='gzip')
+    assert len(app.compressor.cache) == 1
+    assert first.body == second.body
+    _get(app, '/big/', encoding='deflate')
+    assert len(app.compressor.cache) == 2
+
+
+def test_cache_is_bounded():
+    compressor = Compressor(min_size=0, cache_size=2,
+                            encodings=('gzip',))
+    for index in range(5):
+        compressor.compress(encoding='gzip', body=b'body' * index)
+    assert len(compressor.cache) == 2
+
+
+def test_cache_evicts_least_recently_used():
+    compressor = Compressor(min_size=0, cache_size=2, encodings=('gzip',))
+    compressor.compress(encoding='gzip', body=b'first')
+    compressor.compress(encoding='gzip', body=b'second')
+    compressor.compress(encoding='gzip', body=b'first')
+    compressor.compress(encoding='gzip', body=b'third')
+    kept = compressor.cache.values()
+    assert [zlib.decompress(body, 16 + zlib.MAX_WBITS) for body in kept] == [
+        b'first', b'third']
+
+
+def test_disabled():
+    app = Blanket(configuration={'compression': None})
+    app.add(path='/big/', handler=_big, outputs=[JSON])
+    response = _get(app, '/big/', encoding='gzip')
+    assert app.compressor is None
+    assert response.content_encoding is None
+
+
+def test_off_by_default():
+    app = Blanket()
+    app.add(path='/big/', handler=_big, outputs=[JSON])
+    response = _get(app, '/big/', encoding='gzip')
+    assert app.compressor is None
+    assert response.content_encoding is None
+    assert 'Vary' not in response.headers
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from datetime import datetime
+from blanket import Blanket
+from blanket import Httpish
+from blanket import JSON
+from webob import Request
+
+
+class _Counted(object):
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, request, id):
+        self.calls.append(id)
+        return {'id': id}
+
+
+def _app(handler):
+    app = Blanket()
+    app.add(path='/{id!d}/', handler=handler, outputs=[JSON])
+    return app
+
+
+def _get(app, method='GET', **headers):
+    request = Request.blank('/4/', accept='application/json',
+                            method=method, headers=headers)
+    return request.get_response(app)
+
+
+def _function_handler():
+    counted = _Counted()
+    def handler(request, id):
+        return counted(request, id)
+    handler.etag = lambda request, id: 'v{0}'.format(id)
+    handler.last_modified = lambda request, id: datetime(2015, 1, 2, 3, 4, 5)
+    return handler, counted
+
+
+def test_sets_validators_on_full_response():
+    handler, counted = _function_handler()
+    response = _get(_app(handler))
+    assert response.status_int == 200
+    assert response.etag == 'v4'
+    assert response.last_modified.year == 2015
+    assert counted.calls == ['4']
+
+
+def test_if_none_match():
+    handler, counted = _function_handler()
+    response = _get(_app(handler), **{'If-None-Match': '"v4"'})
+    assert response.status_int == 304
+    assert response.body == b''
+    assert response.headers['ETag'] == '"v4"'
+    assert counted.calls == []
+    assert _get(_app(handler), **{'If-None-Match': '"v3"'}).status_int == 200
+
+
+def test_if_modified_since():
+    handler, counted = _function_handler()
+    app = _app(handler)
+    current = _get(app, **{'If-Modified-Since':
+                           'Fri, 02 Jan 2015 03:04:05 GMT'})
+    assert current.status_int == 304
+    stale = _get(app, **{'If-Modified-Since':
+                         'Thu, 01 Jan 2015 00:00:00 GMT'})
+    assert stale.status_int == 200
+    assert counted.calls == ['4']
+
+
+def test_head_skips_handler_and_output():
+    handler, counted = _function_handler()
+    response = _get(_app(handler), method='HEAD')
+    assert response.status_int == 200
+    assert response.etag == 'v4'
+    assert response.content_type == 'application/json'
+    assert response.body == b''
+    assert counted.calls == []
+
+
+def test_head_without_validators_skips_output():
+    calls = []
+    def handler(request, id):
+        calls.append(id)
+        return {'id': id}
+    response = _get(_app(handler), method='HEAD')
+    assert response.status_int == 200
+    assert response.body == b''
+    assert calls == ['4']
+
+
+class _Resource(Httpish):
+    gets = []
+
+    def etag(self, request, id):
+        return 'resource{0}'.format(id)
+
+    def get(self, request, id):
+        self.gets.append(id)
+        return {'id': id}
+
+
+def _resource(request, id):
+    return _Resource
+
+
+def test_httpish_validators():
+    _Resource.gets[:] = []
+    app = _app(_resource)
+    assert _get(app, **{'If-None-Match': '"resource4"'}).status_int == 304
+    assert _get(app, method='HEAD').status_int == 200
+    assert _Resource.gets == []
+    response = _get(app)
+    assert response.etag == 'resource4'
+    assert _Resource.gets == ['4']
+
+
+def test_declining_route_leaves_no_validators():
+    def maybe(request, x):
+        return None
+    maybe.etag = lambda request, x: 'A'
+    app = Blanket()
+    app.add(path='/{x!s}/', handler=maybe, outputs=[JSON])
+    app.add(path='/b/', handler=lambda request: {'b': True}, outputs=[JSON])
+    response = Request.blank('/b/', accept='application/json'
+                             ).get_response(app)
+    assert response.json == {'b': True}
+    assert response.etag is None
+
+
+def test_declining_route_validators_can_decline_too():
+    def maybe(request, x):
+        if x != 'a':
+            return None
+        return {'a': True}
+    maybe.etag = lambda request, x: 'A' if x == 'a' else None
+    app = Blanket()
+    app.add(path='/{x!s}/', handler=maybe, outputs=[JSON])
+    app.add(path='/b/', handler=lambda request: {'b': True}, outputs=[JSON])
+    response = Request.blank('/b/', accept='application/json',
+                             headers={'If-None-Match': '"A"'}
+                             ).get_response(app)
+    assert response.status_int == 200
+    assert response.json == {'b': True}
+    response = Request.blank('/a/', accept='application/json',
+                             headers={'If-None-Match': '"A"'}
+                             ).get_response(app)
+    assert response.status_int == 304
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import threading
+import time
+from blanket import Blanket
+from blanket import BlanketValueError
+from blanket import Deadline
+from blanket import DeadlineExceeded
+from blanket import JSON
+from blanket import LocalRequest
+from blanket import ManyHandler
+from blanket import TIMED_OUT
+from blanket import keepcalling
+import pytest
+from webob import Request
+
+
+def _budget(request):
+    return {'budget': request.deadline.budget,
+            'remaining': request.deadline.remaining()}
+
+
+def _slow(request):
+    time.sleep(0.05)
+    return lambda request: {'finished': True}
+
+
+def _fast(request):
+    return {'fast': True}
+
+
+def _timed_out(exception, request):
+    return {'timed_out': str(exception)}
+
+
+def test_deadline_within():
+    outer = Deadline(budget=0.5)
+    inner = Deadline(budget=10, within=outer)
+    assert inner.expires == outer.expires
+    assert inner.budget == 0.5
+    assert 0 < inner.remaining() <= 0.5
+    assert not inner.expired()
+    assert Deadline(budget=0.1, within=outer).budget == 0.1
+
+
+def test_keepcalling_checks_between_steps():
+    request = LocalRequest(method='GET', path='/',
+                           deadline=Deadline(budget=0.01))
+    with pytest.raises(DeadlineExceeded):
+        keepcalling(_slow, request=request)
+    request.deadline = Deadline(budget=10)
+    assert keepcalling(_slow, request=request) == {'finished': True}
+
+
+def test_many_handler_checks_between_handlers():
+    request = LocalRequest(method='GET', path='/',
+                           deadline=Deadline(budget=0.01))
+    handler = ManyHandler(handlers=(_slow, _fast))
+    with pytest.raises(DeadlineExceeded):
+        keepcalling(handler, request=request)
+
+
+def test_route_deadline_is_a_504():
+    app = Blanket()
+    app.add(path='/slow/', handler=_slow, outputs=[JSON], deadline=0.01)
+    app.add(path='/fast/', handler=_fast, outputs=[JSON], deadline=0.01)
+    response = Request.blank('/slow/', accept='application/json'
+                             ).get_response(app)
+    assert response.status_int == 504
+    assert app.errors.counts == {'DeadlineExceeded': 1}
+    response = Request.blank('/fast/', accept='application/json'
+                             ).get_response(app)
+    assert response.json == {'fast': True}
+
+
+def test_timeout_goes_through_error_router():
+    app = Blanket()
+    app.add(path='/slow/', handler=_slow, outputs=[JSON], deadline=0.01)
+    app.add(exception_class=DeadlineExceeded, handler=_timed_out,
+            outputs=[JSON])
+    response = Request.blank('/slow/', accept='application/json'
+                             ).get_response(app)
+    assert response.status_int == 200
+    assert 'exceeded' in response.json['timed_out']
+
+
+def _context(app, path):
+    request = Request.blank(path, accept='*/*')
+    return app.handle(environ=request.environ)[1]
+
+
+def test_app_deadline_bounds_the_route():
+    app = Blanket(configuration={'deadline': 0.5})
+    app.add(path='/app/', handler=_budget, outputs=[JSON])
+    app.add(path='/long/', handler=_budget, outputs=[JSON], deadline=60)
+    app.add(path='/short/', handler=_budget, outputs=[JSON], deadline=0.1)
+    context = _context(app, '/app/')
+    assert context['budget'] == 0.5
+    assert 0 < context['remaining'] <= 0.5
+    assert _context(app, '/long/')['budget'] == 0.5
+    assert _context(app, '/short/')['budget'] == 0.1
+
+
+def test_declining_route_restores_the_deadline():
+    app = Blanket()
+    app.add(path='/{x!s}/', handler=lambda request, x: None, outputs=[JSON],
+            deadline=0.5)
+    app.add(path='/a/', outputs=[JSON],
+            handler=lambda request: {'deadline': request.deadline})
+    assert _context(app, '/a/') == {'deadline': None}
+
+
+def test_rendering_is_not_held_to_the_deadline():
+    def _just_in_time(request):
+        time.sleep(0.06)
+        return {'finished': True}
+    app = Blanket(configuration={'deadline': 0.05})
+    app.add(path='/', handler=_just_in_time, outputs=[JSON])
+    response = Request.blank('/', accept='application/json').get_response(app)
+    assert response.status_int == 200
+    assert response.json == {'finished': True}
+
+
+def test_no_deadline():
+    app = Blanket()
+    app.add(path='/', handler=lambda request: {'deadline': request.deadline},
+            outputs=[JSON])
+    assert _context(app, '/') == {'deadline': None}
+
+
+def test_add_validation():
+    app = Blanket()
+    with pytest.raises(BlanketValueError):
+        app.add(exception_class=ValueError, handler=_timed_out,
+                outputs=[JSON], deadline=1)
+    with pytest.raises(BlanketValueError):
+        app.add(path='/', handler=_fast, outputs=[JSON], deadline=0)
+
+
+def test_dispatch_many_threaded_deadline():
+    release = threading.Event()
+
+    def _stuck(request):
+        release.wait(5)
+        return lambda: {'never': 'used'}
+
+    app = Blanket()
+    app.add(path='/stuck/', handler=_stuck, outputs=[JSON])
+    app.add(path='/fast/', handler=_fast, outputs=[JSON])
+    try:
+        result = app.dispatch_many([('GET', '/fast/', None),
+                                    ('GET', '/stuck/', None)],
+                                   threads=2, deadline=Deadline(budget=0.05))
+    finally:
+        release.set()
+    assert result == [{'fast': True}, TIMED_OUT]
+    assert app.errors.counts == {'DeadlineExceeded': 1}
+
+
+def test_dispatch_many_deadline_without_threads():
+    app = Blanket(configuration={'deadline': 0.01})
+    app.add(path='/slow/', handler=_slow, outputs=[JSON])
+    assert app.dispatch_many([('GET', '/slow/', None)]) == [TIMED_OUT]
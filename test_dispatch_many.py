@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from blanket import Blanket
+from blanket import Httpish
+from blanket import JSON
+from blanket import NoRouteHandler
+from blanket import NOT_FOUND
+
+
+def _item(request, thing, id):
+    return {'id': int(id), 'params': dict(request.params)}
+
+
+def _declines(request, id):
+    return None
+
+
+class _Thing(Httpish):
+    def get(self, request):
+        return {'method': 'get'}
+
+    def post(self, request):
+        return {'method': 'post', 'posted': dict(request.POST)}
+
+
+def _thing(request):
+    return _Thing
+
+
+def _not_found(exception, request):
+    return {'missing': request.path}
+
+
+def _app():
+    app = Blanket()
+    app.add(path='/item/{id!d}/', handler=_declines, outputs=[JSON])
+    app.add(path='/{thing!s}/{id!d}/', handler=_item, outputs=[JSON])
+    app.add(path='/thing/', handler=_thing, outputs=[JSON])
+    return app
+
+
+def test_dispatch_many():
+    app = _app()
+    result = app.dispatch_many([
+        ('GET', '/item/1/', {'a': 'b'}),
+        ('GET', '/thing/', None),
+        ('POST', '/thing/', {'c': 'd'}),
+        ('GET', '/item/1/', None),
+    ])
+    assert result == [
+        {'id': 1, 'params': {'a': 'b'}},
+        {'method': 'get'},
+        {'method': 'post', 'posted': {'c': 'd'}},
+        {'id': 1, 'params': {}},
+    ]
+
+
+def test_dispatch_many_threaded():
+    app = _app()
+    calls = [('GET', '/item/{0}/'.format(i), None) for i in range(50)]
+    result = app.dispatch_many(calls, threads=4)
+    assert [context['id'] for context in result] == list(range(50))
+
+
+def test_dispatch_many_uses_error_router():
+    app = _app()
+    app.add(exception_class=NoRouteHandler, handler=_not_found,
+            outputs=[JSON])
+    assert app.dispatch_many([('GET', '/nope/', None)]) == [
+        {'missing': '/nope/'}]
+
+
+def test_dispatch_many_not_found():
+    app = _app()
+    assert app.dispatch_many([('GET', '/nope/', None)]) == [NOT_FOUND]
+
+
+def test_dispatch_many_shares_providers():
+    app = Blanket()
+    app.provide('user', lambda request: request.params['user'])
+    app.add(path='/', handler=lambda request, user: {'user': user},
+            outputs=[JSON])
+    result = app.dispatch_many([('GET', '/', {'user': 'a'}),
+                                ('GET', '/', {'user': 'b'})])
+    assert result == [{'user': 'a'}, {'user': 'b'}]
+
+
+def test_dispatch_many_with_validators():
+    def _versioned(request, id):
+        return {'id': int(id)}
+    _versioned.etag = lambda request, id: 'v{0}'.format(id)
+    app = Blanket()
+    app.add(path='/{id!d}/', handler=_versioned, outputs=[JSON])
+    assert app.dispatch_many([('GET', '/4/', {}), ('HEAD', '/5/', {})]) == [
+        {'id': 4}, {}]
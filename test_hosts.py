@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from blanket import Blanket
+from blanket import BlanketValueError
+from blanket import CompactRouter
+from blanket import DuplicateRoute
+from blanket import HostRouter
+from blanket import JSON
+from blanket import NOT_FOUND
+from blanket import NoRouteHandler
+from blanket import normalize_host
+import pytest
+from webob import Request
+
+
+def _default(request):
+    return {'host': None}
+
+
+def _exact(request):
+    return {'host': 'exact'}
+
+
+def _wildcard(request, id):
+    return {'host': 'wildcard', 'id': id}
+
+
+def _tenant(request, tenant, id):
+    return {'host': 'tenant', 'tenant': tenant, 'id': id}
+
+
+def _app(**configuration):
+    app = Blanket(configuration=configuration)
+    app.add(path='/', handler=_default, outputs=[JSON])
+    app.add(path='/', handler=_exact, outputs=[JSON], host='www.example.com')
+    app.add(path='/items/{id!d}/', handler=_tenant, outputs=[JSON],
+            host='{tenant!slug}.example.com')
+    app.add(path='/items/{id!d}/', handler=_wildcard, outputs=[JSON],
+            host='*.example.org')
+    return app
+
+
+def _get(app, path, host):
+    request = Request.blank(path, accept='application/json',
+                            headers={'Host': host})
+    return app.handle(environ=request.environ)[1]
+
+
+@pytest.mark.parametrize('configuration', ({}, {'compact_routes': True}))
+def test_host_selection(configuration):
+    app = _app(**configuration)
+    assert _get(app, '/', 'www.example.com') == {'host': 'exact'}
+    assert _get(app, '/', 'WWW.Example.com.:8080') == {'host': 'exact'}
+    assert _get(app, '/', 'other.net') == {'host': None}
+    assert _get(app, '/items/3/', 'acme.example.com') == {
+        'host': 'tenant', 'tenant': 'acme', 'id': '3'}
+    assert _get(app, '/items/3/', 'acme.example.org') == {
+        'host': 'wildcard', 'id': '3'}
+
+
+def test_only_the_hosts_routes_are_used():
+    app = _app()
+    # the host-less `/` isn't a fallback for a host with routes
+    assert _get(app, '/', 'acme.example.com') is NOT_FOUND
+    # wildcards and captures only match a single label
+    assert _get(app, '/items/3/', 'a.b.example.org') is NOT_FOUND
+    assert _get(app, '/items/3/', 'example.org') is NOT_FOUND
+    assert _get(app, '/items/3/', 'a_b!.example.com') is NOT_FOUND
+
+
+def test_not_found_lists_the_hosts_routes():
+    app = _app()
+    app.add(exception_class=NoRouteHandler, outputs=[JSON],
+            handler=lambda exception, request: {'missing': str(exception)})
+    context = _get(app, '/', 'acme.example.com')
+    assert '/items/{id!d}/' in context['missing']
+
+
+def test_captures_count_towards_arguments():
+    app = Blanket()
+    with pytest.raises(BlanketValueError):
+        app.add(path='/items/{id!d}/', handler=_wildcard, outputs=[JSON],
+                host='{tenant!slug}.example.com')
+    with pytest.raises(BlanketValueError):
+        app.add(path='/items/{id!d}/', handler=_tenant, outputs=[JSON],
+                host='*.example.com')
+    # a failed first route leaves nothing behind for the host
+    assert not app.hosts
+
+
+def test_invalid_hosts():
+    hosts = HostRouter()
+    for host in ('www.*.com', '*', '{tenant!slug}', 'www*.example.com',
+                 'www.{tenant!slug}.com'):
+        with pytest.raises(BlanketValueError):
+            hosts.add(host=host, thing='/', handler=_default, outputs=[JSON])
+    with pytest.raises(BlanketValueError):
+        Blanket().add(exception_class=ValueError, host='example.com',
+                      handler=_default, outputs=[JSON])
+
+
+def test_duplicates_are_per_host():
+    app = _app()
+    app.add(path='/', handler=_exact, outputs=[JSON], host='api.example.com')
+    with pytest.raises(DuplicateRoute):
+        app.add(path='/', handler=_exact, outputs=[JSON],
+                host='API.example.com')
+    assert app.hosts.listing() == ('*.example.org', 'api.example.com',
+                                   'www.example.com',
+                                   '{tenant!slug}.example.com')
+    assert len(app) == 5
+
+
+def test_router_class_follows_configuration():
+    app = _app(compact_routes=True)
+    assert all(isinstance(router, CompactRouter) for _, router in app.hosts)
+
+
+def test_admission_stats_include_hosts():
+    app = Blanket()
+    app.add(path='/', handler=_exact, outputs=[JSON], host='example.com',
+            max_concurrency=1)
+    assert list(app.admission_stats()) == ['example.com/']
+
+
+@pytest.mark.parametrize('host, expected', (
+    ('Example.COM', 'example.com'),
+    ('example.com:80', 'example.com'),
+    ('example.com.', 'example.com'),
+    ('[::1]', '[::1]'),
+    ('[::1]:8080', '[::1]'),
+))
+def test_normalize_host(host, expected):
+    assert normalize_host(host) == expected
@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import os
+import subprocess
+import sys
+
+HERE = os.path.abspath(os.path.dirname(__file__))
+
+
+def test_import_is_minimal():
+    lazy = ('webob', 'json', 'inspect', 'hashlib', 'chevron', 'brotli',
+            'tempfile', 'random', 'zlib')
+    script = ("import sys, blanket; "
+              "print(','.join(sorted(name for name in {lazy!r} "
+              "if name in sys.modules)))".format(lazy=lazy))
+    output = subprocess.check_output([sys.executable, '-c', script],
+                                     cwd=HERE)
+    assert output.strip() == b''
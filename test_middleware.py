@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from blanket import Blanket
+from blanket import JSON
+from blanket import Output
+from webob import Request
+
+
+def _ok(request):
+    return {'id': request.request_id, 'seen': list(request.seen)}
+
+
+def _environ(path='/', **headers):
+    return Request.blank(path, accept='application/json',
+                         headers=headers).environ
+
+
+def _request_id(request, call_next):
+    request.request_id = request.headers.get('X-Request-Id', 'none')
+    request.seen = ['request_id']
+    return call_next(request)
+
+
+def _timing(request, call_next):
+    request.seen.append('timing')
+    context = call_next(request)
+    context['timed'] = True
+    return context
+
+
+def _auth(request, call_next):
+    if 'Authorization' not in request.headers:
+        return {'denied': True}
+    return call_next(request)
+
+
+def test_runs_in_order_around_the_handler():
+    app = Blanket()
+    app.use(_request_id)
+    app.use(_timing)
+    app.add(path='/', handler=_ok, outputs=[JSON])
+    assert app.get_response(environ=_environ(**{'X-Request-Id': 'abc'})) == {
+        'id': 'abc', 'seen': ['request_id', 'timing'], 'timed': True}
+
+
+def test_short_circuits_before_routing():
+    calls = []
+    def handler(request):
+        calls.append(True)
+        return {'ok': True}
+    app = Blanket()
+    app.use(_auth)
+    app.add(path='/', handler=handler, outputs=[JSON])
+    assert app.get_response(environ=_environ()) == {'denied': True}
+    assert calls == []
+    assert app.get_response(environ=_environ(Authorization='x')) == {
+        'ok': True}
+
+
+def test_short_circuit_is_rendered_with_default_outputs():
+    app = Blanket()
+    app.use(_auth)
+    app.add(path='/', handler=lambda request: {'ok': True}, outputs=[JSON])
+    response = Request.blank('/', accept='application/json').get_response(app)
+    assert response.status_int == 200
+    assert response.json == {'denied': True}
+    response = Request.blank('/', accept='text/html').get_response(app)
+    assert response.status_int == 406
+
+
+def test_short_circuit_default_outputs_are_configurable():
+    html = Output(responds_to=('text/html',),
+                  responds_with=lambda request, context: '<p>denied</p>')
+    app = Blanket(configuration={'default_outputs': [html]})
+    app.use(_auth)
+    app.add(path='/', handler=lambda request: {'ok': True}, outputs=[JSON])
+    response = Request.blank('/', accept='text/html').get_response(app)
+    assert response.status_int == 200
+    assert response.body == b'<p>denied</p>'
+    response = Request.blank('/', accept='application/json',
+                             headers={'Authorization': 'x'}).get_response(app)
+    assert response.json == {'ok': True}
+
+
+def test_pipeline_is_precomposed_and_rebuilt_on_use():
+    app = Blanket()
+    app.add(path='/', handler=lambda request: {'ok': True}, outputs=[JSON])
+    app.get_response(environ=_environ())
+    assert app.pipeline == app.dispatch
+    app.use(_auth)
+    assert app.pipeline is None
+    assert app.get_response(environ=_environ()) == {'denied': True}
+    assert app.pipeline is not None
+
+
+def test_middleware_errors_go_to_error_router():
+    def broken(request, call_next):
+        raise KeyError('middleware')
+    app = Blanket()
+    app.use(broken)
+    app.add(path='/', handler=lambda request: {'ok': True}, outputs=[JSON])
+    app.add(exception_class=KeyError, outputs=[JSON],
+            handler=lambda exception, request: {'error': True})
+    assert app.get_response(environ=_environ()) == {'error': True}
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import logging
+from blanket import Blanket
+from blanket import ErrorLog
+from blanket import JSON
+from blanket import LazyMessage
+from blanket import NoRouteHandler
+from blanket import Router
+from webob import Request
+
+
+def _ok(request):
+    return {'ok': True}
+
+
+def _raises(request):
+    raise KeyError('nope')
+
+
+def test_miss_returns_preallocated_reply():
+    app = Blanket()
+    app.add(path='/', handler=_ok, outputs=[JSON])
+    response = Request.blank('/missing/', accept='*/*').get_response(app)
+    assert response.status_int == 404
+    assert response.body == b'Not Found'
+    assert app.errors.counts == {'NotFound': 1}
+
+
+def test_miss_goes_to_error_router_if_asked():
+    app = Blanket()
+    app.add(path='/', handler=_ok, outputs=[JSON])
+    app.add(exception_class=NoRouteHandler, outputs=[JSON],
+            handler=lambda exception, request: {'missing': str(exception)})
+    request = Request.blank('/missing/', accept='application/json')
+    context = app.handle(environ=request.environ)[1]
+    assert context['missing'].startswith("`/missing/` does not match any of "
+                                         "the given routes: (")
+
+
+def test_router_message_is_lazy():
+    router = Router()
+    router.add(thing='/', handler=_ok, outputs=[JSON])
+    listed = []
+    def listing():
+        listed.append(True)
+        return router.listing()
+    message = LazyMessage("{path!s}: {routes!r}", listing=listing, path='/x')
+    exc = NoRouteHandler(message)
+    assert listed == []
+    assert str(exc) == "/x: {0!r}".format(('/',))
+    assert listed == [True]
+
+
+class _Records(logging.Handler):
+    def __init__(self):
+        logging.Handler.__init__(self)
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+def test_error_log_is_rate_limited():
+    logger = logging.getLogger('test_not_found')
+    records = _Records()
+    logger.addHandler(records)
+    errors = ErrorLog(logger=logger, interval=60, burst=2)
+    for _ in range(5):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            errors(name='ValueError', msg='failed')
+    logger.removeHandler(records)
+    tracebacks = [record for record in records.records if record.exc_info]
+    assert len(tracebacks) == 2
+    assert errors.counts == {'ValueError': 5}
+    assert errors.suppressed == 3
+
+
+def test_handler_errors_are_counted():
+    app = Blanket(configuration={'error_log': {'burst': 0}})
+    app.add(path='/', handler=_raises, outputs=[JSON])
+    app.add(exception_class=KeyError, outputs=[JSON],
+            handler=lambda exception, request: {'error': True})
+    request = Request.blank('/', accept='application/json')
+    assert app.get_response(environ=request.environ) == {'error': True}
+    assert app.errors.counts == {'KeyError': 1}
+    assert app.errors.suppressed == 1
+
+
+def test_counts_from_many_threads():
+    import threading
+    errors = ErrorLog(logger=logging.getLogger('test_not_found'))
+    def miss():
+        for _ in range(1000):
+            errors.count(name='NotFound')
+    threads = [threading.Thread(target=miss) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors.counts == {'NotFound': 8000}
+    assert len(errors.shards) == 8
@@ -3,7 +3,10 @@ from __future__ import absolute_import
 from __future__ import print_function
 from __future__ import unicode_literals
 from __future__ import division
+from blanket import Blanket
 from blanket import JSON
+from blanket import NoRouteHandler
+from blanket import Output
 from blanket import mustache
 from webob import Request
 
@@ -36,3 +39,77 @@ def test_mustache():
     assert tuple(response) == ('Hello Chris',
                                'You have just won 10000 dollars!',
                                'Well, 6000.0 dollars, after taxes.')
+
+
+def _broken_renderer(request, context):
+    raise ValueError('cannot render')
+
+
+BROKEN = Output(responds_to=('text/broken',), responds_with=_broken_renderer)
+
+
+def _broken_app():
+    app = Blanket(configuration={'compression': None})
+    app.add(path='/', handler=lambda request: {'test': 1}, outputs=[BROKEN])
+    return app
+
+
+def test_failing_output_is_a_500():
+    app = _broken_app()
+    response = Request.blank('/', accept='text/broken').get_response(app)
+    assert response.status_int == 500
+    assert app.errors.counts == {'ValueError': 1}
+
+
+def test_failing_output_goes_through_error_router():
+    app = _broken_app()
+    app.add(exception_class=ValueError, outputs=[JSON],
+            handler=lambda exception, request: {'error': str(exception)})
+    response = Request.blank('/', accept='text/broken, application/json'
+                             ).get_response(app)
+    assert response.status_int == 200
+    assert response.json == {'error': 'cannot render'}
+
+
+def test_failing_error_output_is_a_500():
+    app = _broken_app()
+    app.add(exception_class=ValueError, outputs=[BROKEN],
+            handler=lambda exception, request: {'error': str(exception)})
+    response = Request.blank('/', accept='text/broken').get_response(app)
+    assert response.status_int == 500
+
+
+def test_error_context_without_a_request():
+    app = Blanket(configuration={'compression': None})
+    app.add(exception_class=NoRouteHandler, outputs=[JSON],
+            handler=lambda exception, request: {'error': str(exception)})
+    response = Request.blank('/', accept='application/json').get_response(app)
+    assert response.status_int == 200
+    assert response.content_type == 'application/json'
+    assert response.json == {'error': 'No routes are defined'}
+
+
+def _deny(request, call_next):
+    return {'denied': True}
+
+
+def test_failing_default_output_is_a_500():
+    app = Blanket(configuration={'compression': None,
+                                 'default_outputs': [BROKEN]})
+    app.use(_deny)
+    app.add(path='/', handler=lambda request: {'test': 1}, outputs=[JSON])
+    response = Request.blank('/', accept='text/broken').get_response(app)
+    assert response.status_int == 500
+
+
+def test_failing_default_output_goes_through_error_router():
+    app = Blanket(configuration={'compression': None,
+                                 'default_outputs': [BROKEN]})
+    app.use(_deny)
+    app.add(path='/', handler=lambda request: {'test': 1}, outputs=[JSON])
+    app.add(exception_class=ValueError, outputs=[JSON],
+            handler=lambda exception, request: {'error': str(exception)})
+    response = Request.blank('/', accept='text/broken, application/json'
+                             ).get_response(app)
+    assert response.status_int == 200
+    assert response.json == {'error': 'cannot render'}
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import time
+from blanket import Blanket
+from blanket import JSON
+from blanket import Profiler
+from blanket import profile_report
+from webob import Request
+
+
+def _busy_wait(seconds):
+    finish = time.time() + seconds
+    while time.time() < finish:
+        pass
+
+
+def _slow(request):
+    _busy_wait(0.1)
+    return {'slow': True}
+
+
+def _get(app, path):
+    return Request.blank(path, accept='application/json').get_response(app)
+
+
+def test_profiles_sampled_requests_by_route(tmpdir):
+    app = Blanket(configuration={'profile_rate': 1, 'profile_interval': 0.001})
+    app.add(path='/slow/', handler=_slow, outputs=[JSON])
+    app.add(path='/_profile/', handler=profile_report, outputs=[JSON])
+    try:
+        _get(app, '/slow/')
+    finally:
+        app.profiler.stop()
+    assert app.profiler.samples > 0
+    collapsed = app.profiler.collapsed(route='/slow/')
+    lines = collapsed.splitlines()
+    assert lines
+    assert all(line.startswith('/slow/;') for line in lines)
+    assert any('_busy_wait (test_profiler.py:' in line for line in lines)
+
+    # the report itself shouldn't be sampled, which would start the sampler
+    # thread again.
+    app.profiler.rate = 0
+    try:
+        report = _get(app, '/_profile/?route=/slow/')
+    finally:
+        app.profiler.stop()
+    assert report.body.decode('utf-8') == collapsed
+    assert app.profiler.sampler is None
+
+    path = tmpdir.join('stacks.txt')
+    app.profiler.dump(str(path))
+    assert path.read() == app.profiler.collapsed()
+
+
+def test_unsampled_requests_are_not_watched():
+    app = Blanket(configuration={'profile_rate': 0.0001})
+    app.profiler.rate = 0
+    app.add(path='/slow/', handler=_slow, outputs=[JSON])
+    _get(app, '/slow/')
+    assert app.profiler.sampler is None
+    assert app.profiler.samples == 0
+
+
+def test_disabled_by_default():
+    app = Blanket()
+    assert app.profiler is None
+
+
+def test_reset():
+    profiler = Profiler(rate=1)
+    profiler.stacks = {'/': {'a;b': 1}}
+    profiler.samples = 1
+    assert profiler.collapsed() == '/;a;b 1'
+    profiler.reset()
+    assert profiler.collapsed() == ''
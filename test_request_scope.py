@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from wsgiref.util import setup_testing_defaults
+from blanket import Blanket
+from blanket import BlanketLookupError
+from blanket import BlanketValueError
+from blanket import Httpish
+from blanket import JSON
+from blanket import ManyHandler
+from blanket import _accepted_arguments_cache
+from blanket import RequestScope
+import pytest
+from webob import Request
+
+
+def _environ(path):
+    environ = {'PATH_INFO': path, 'HTTP_ACCEPT': 'application/json'}
+    setup_testing_defaults(environ)
+    return environ
+
+
+def test_provider_runs_once_across_many_handler():
+    calls = []
+    def row(request, id):
+        calls.append(id)
+        return {'id': int(id)}
+    def title(request, id, row):
+        return {'title': 'row {0}'.format(row['id'])}
+    def body(request, id, row):
+        return {'body': row}
+    def page(request, id):
+        return ManyHandler([title, body])
+    app = Blanket()
+    app.provide('row', row)
+    app.add(path='/{id!d}/', handler=page, outputs=[JSON])
+    result = app.get_response(environ=_environ('/4/'))
+    assert result == {'title': 'row 4', 'body': {'id': 4}}
+    assert calls == ['4']
+
+
+def test_provider_injected_through_keepcalling_chain():
+    def user(request):
+        return 'bob'
+    def inner(request, user):
+        return {'user': user}
+    def outer(request):
+        return inner
+    app = Blanket()
+    app.provide('user', user)
+    app.add(path='/', handler=outer, outputs=[JSON])
+    assert app.get_response(environ=_environ('/')) == {'user': 'bob'}
+
+
+def test_provider_injected_into_httpish_method():
+    class Page(Httpish):
+        def get(self, request, user):
+            return {'user': user}
+    def page(request):
+        return Page
+    app = Blanket()
+    app.provide('user', lambda request: 'alice')
+    app.add(path='/', handler=page, outputs=[JSON])
+    assert app.get_response(environ=_environ('/')) == {'user': 'alice'}
+
+
+def test_providers_depending_on_providers():
+    def session(request):
+        return {'uid': 1}
+    def user(session):
+        return 'user{0}'.format(session['uid'])
+    scope = RequestScope(providers={'session': session, 'user': user},
+                         request=Request.blank('/'))
+    assert scope['user'] == 'user1'
+    assert 'session' in scope
+
+
+def test_cyclic_providers():
+    scope = RequestScope(providers={'a': lambda b: b, 'b': lambda a: a},
+                         request=Request.blank('/'))
+    with pytest.raises(BlanketValueError):
+        scope['a']
+
+
+def test_missing_provider():
+    scope = RequestScope(providers={}, request=Request.blank('/'))
+    with pytest.raises(BlanketLookupError):
+        scope['nope']
+
+
+def test_duplicate_provider():
+    app = Blanket()
+    app.provide('user', lambda request: None)
+    with pytest.raises(BlanketValueError):
+        app.provide('user', lambda request: None)
+
+
+def test_closures_share_an_argument_cache_entry():
+    def page(request, id):
+        def inner(request, id, row):
+            return {'row': row}
+        return inner
+    app = Blanket()
+    app.provide('row', lambda request, id: int(id))
+    app.add(path='/{id!d}/', handler=page, outputs=[JSON])
+    app.get_response(environ=_environ('/1/'))
+    size = len(_accepted_arguments_cache)
+    for index in range(50):
+        assert app.get_response(environ=_environ('/{0}/'.format(index))) == {
+            'row': index}
+    assert len(_accepted_arguments_cache) == size
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+from blanket import Blanket
+from blanket import BlanketValueError
+from blanket import JSON
+from blanket import LazyRegex
+from blanket import Router
+import pytest
+from webob import Request
+
+
+def _fake_handler(a, request=None):
+    return {'test': a}
+
+
+def _other_handler(a, request=None):
+    return {'other': a}
+
+
+def test_dump_and_restore():
+    router = Router()
+    router.add(thing='test/{a!s}/', handler=_fake_handler, outputs=[JSON])
+    router.add(thing='test2/{a!d}/', handler=_fake_handler, outputs=[JSON])
+    snapshot = router.dump()
+    assert len(snapshot['routes']) == 2
+
+    restored = Router()
+    restored.restore(snapshot)
+    restored.add(thing='test/{a!s}/', handler=_fake_handler, outputs=[JSON])
+    restored.add(thing='test2/{a!d}/', handler=_fake_handler, outputs=[JSON])
+    assert restored.snapshot is not None
+    assert all(isinstance(route.pattern.regex, LazyRegex)
+               for route in restored)
+    assert restored(request=Request.blank('/test2/4/')) == {'test': '4'}
+
+
+def test_stale_snapshot_is_discarded():
+    router = Router()
+    router.add(thing='test/{a!s}/', handler=_fake_handler, outputs=[JSON])
+    restored = Router()
+    restored.restore(router.dump())
+    restored.add(thing='test/{a!s}/', handler=_other_handler, outputs=[JSON])
+    assert restored.snapshot is None
+    assert restored(request=Request.blank('/test/x/')) == {'other': 'x'}
+
+
+def _version_one():
+    def _handler(request, a):
+        return {'a': a}
+    return _handler
+
+
+def _version_two():
+    def _handler(request, a, b):
+        return {'a': a, 'b': b}
+    return _handler
+
+
+def test_changed_signature_is_stale():
+    router = Router()
+    router.add(thing='/{a!s}/', handler=_version_one(), outputs=[JSON])
+    restored = Router()
+    restored.restore(router.dump())
+    with pytest.raises(BlanketValueError):
+        restored.add(thing='/{a!s}/', handler=_version_two(), outputs=[JSON])
+    assert restored.snapshot is None
+
+
+def test_changed_providers_are_stale():
+    def _provided(request, a, user):
+        return {'a': a, 'user': user}
+    app = Blanket()
+    app.provide('user', lambda request: 'someone')
+    app.add(path='/{a!s}/', handler=_provided, outputs=[JSON])
+    restored = Blanket()
+    restored.router.restore(app.router.dump())
+    with pytest.raises(BlanketValueError):
+        restored.add(path='/{a!s}/', handler=_provided, outputs=[JSON])
+    assert restored.router.snapshot is None
+
+
+def test_unsupported_version():
+    router = Router()
+    with pytest.raises(BlanketValueError):
+        router.restore({'version': -1, 'routes': []})
+
+
+def test_save_and_load(tmpdir):
+    path = str(tmpdir.join('routes.json'))
+    app = Blanket()
+    assert app.load_routes(path) is False
+    app.add(path='/{a!s}/', handler=_fake_handler, outputs=[JSON])
+    app.save_routes(path)
+
+    app2 = Blanket()
+    assert app2.load_routes(path) is True
+    app2.add(path='/{a!s}/', handler=_fake_handler, outputs=[JSON])
+    assert app2.router.snapshot is not None
+
+
+def test_load_garbage(tmpdir):
+    path = tmpdir.join('routes.json')
+    path.write('not json')
+    app = Blanket()
+    assert app.load_routes(str(path)) is False
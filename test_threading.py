@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+A stress harness for the concurrency model described on `Blanket`: many
+threads drive `Blanket.__call__` while another keeps adding routes and
+providers. Run this file directly for a longer soak.
+"""
+from __future__ import absolute_import
+from __future__ import print_function
+from __future__ import unicode_literals
+from __future__ import division
+import sys
+import threading
+from wsgiref.util import setup_testing_defaults
+from blanket import Blanket
+from blanket import JSON
+
+
+def _static(request):
+    return b'static'
+
+
+def _numbered(request, n):
+    return 'numbered {0}'.format(n).encode('utf-8')
+
+
+def stress(readers=8, requests=200, routes=200):
+    app = Blanket()
+    app.add(path='/', handler=_static, outputs=[JSON])
+    added = ['/']
+    errors = []
+    done = threading.Event()
+
+    def start_response(status, headers, exc_info=None):
+        if not status.startswith('200'):
+            errors.append(status)
+
+    def read():
+        try:
+            for index in range(requests):
+                path = added[index % len(added)]
+                environ = {'PATH_INFO': path,
+                           'HTTP_ACCEPT': 'application/json'}
+                setup_testing_defaults(environ)
+                body = b''.join(app(environ, start_response))
+                if path == '/':
+                    assert body == b'static'
+                else:
+                    assert body.startswith(b'numbered ')
+        except Exception as exc:
+            errors.append(exc)
+
+    def write():
+        try:
+            for index in range(routes):
+                path = '/{0}/{{n!d}}/'.format(index)
+                app.add(path=path, handler=_numbered, outputs=[JSON])
+                added.append('/{0}/{0}/'.format(index))
+                app.provide('provider{0}'.format(index), _static)
+        except Exception as exc:
+            errors.append(exc)
+        finally:
+            done.set()
+
+    threads = [threading.Thread(target=read) for _ in range(readers)]
+    threads.append(threading.Thread(target=write))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert done.is_set()
+    return app, errors
+
+
+def test_serving_while_adding_routes():
+    app, errors = stress()
+    assert errors == []
+    assert len(app.router.routes) == 201
+    assert len(app.router.seen_routes) == 201
+    assert len(app.providers) == 200
+
+
+if __name__ == '__main__':  # nocover
+    app, errors = stress(readers=int(sys.argv[1]) if len(sys.argv) > 1 else 32,
+                         requests=500, routes=500)
+    print('{0} routes, {1} errors'.format(len(app.router.routes), len(errors)))
+    for error in errors[:10]:
+        print(repr(error))